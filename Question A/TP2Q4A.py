@@ -6,10 +6,17 @@ Ce fichier illuste les concepts de POO suivants en Python :
 - Redéfinition des méthodes (overriding) avec super()
 - Généricité (typing.TypeVar + Generic)
 - Modularité (fonctions réutilisables pour import)
+- Calcul d'aires par lots (LotFormes : un tableau numpy par type de forme)
 """
 
+import time
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, List
+from typing import Any, Callable, Dict, Generic, Iterable, TypeVar, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy est optionnel : sans lui, LotFormes appelle aire() objet par objet
+    np = None
 
 """ Import de la classe Animal depuis module.py pour l'exemple 5 : modularité """
 from module import Animal  
@@ -65,6 +72,158 @@ def demo_polymorphisme() -> None:
     for f in formes:
         print(type(f).__name__, "-> aire :", afficher_aire(f))
 
+# ===========================
+# 1 bis) Calcul d'aires par lots
+# Pour des millions de formes, appeler aire() objet par objet coûte surtout l'appel polymorphe.
+# LotFormes range les paramètres de chaque type enregistré (rayons, côtés) dans des tableaux
+# contigus et calcule toutes les aires d'un type en une seule opération numpy.
+# Les types non enregistrés (ou les sous-classes, qui peuvent redéfinir aire()) gardent l'appel aire().
+# Les formules vectorisées font les mêmes opérations dans le même ordre que aire() :
+# les résultats sont identiques bit à bit.
+# ===========================
+# type -> (nom de l'attribut paramètre, calcul de l'aire sur un tableau de paramètres)
+FORMES_ENREGISTREES: Dict[type, Tuple[str, Callable[[Any], Any]]] = {}
+
+# au-delà, le produit de deux entiers n'est plus exact en float64 (aire() d'un Carre d'entiers renvoie un int)
+MAX_ENTIER_EXACT = 2 ** 26
+
+
+def enregistrer_forme(classe: type, parametre: str, aire_vectorisee: Callable[[Any], Any]) -> None:
+    """Enregistre un type de forme (héritant de Forme ou non) pour le calcul par lots."""
+    FORMES_ENREGISTREES[classe] = (parametre, aire_vectorisee)
+
+
+enregistrer_forme(Cercle, 'rayon', lambda r: 3.141592653589793 * r * r)
+enregistrer_forme(Carre, 'cote', lambda c: c * c)
+enregistrer_forme(Hexagone, 'cote', lambda c: (3 * 3**0.5 / 2) * c * c)
+
+
+def _parametre_vectorisable(valeur: Any) -> bool:
+    # même règle que ajouter_tableau : float / float64, et entiers int / int64 bornés ;
+    # les autres largeurs (float32, uint8...) ne donneraient pas le même résultat que aire()
+    if isinstance(valeur, bool):
+        return False
+    if isinstance(valeur, int) or (np is not None and isinstance(valeur, np.int64)):
+        return abs(int(valeur)) <= MAX_ENTIER_EXACT
+    return isinstance(valeur, float)
+
+
+def _dtype_vectorisable(parametres) -> bool:
+    if parametres.dtype == np.int64:
+        return not len(parametres) or int(np.abs(parametres).max()) <= MAX_ENTIER_EXACT
+    return parametres.dtype == np.float64
+
+
+def _nombre_python(valeur: Any) -> Any:
+    return valeur.item() if isinstance(valeur, np.generic) else valeur
+
+
+class LotFormes:
+    """
+    Conteneur de formes en « struct of arrays » : pour chaque type enregistré, un tableau de paramètres
+    et les positions des formes ; aires() renvoie les aires dans l'ordre d'ajout.
+    """
+    def __init__(self, formes: Iterable = ()) -> None:
+        self._parametres: Dict[type, List] = {}   # morceaux (listes ou tableaux) de paramètres par type
+        self._positions: Dict[type, List] = {}
+        self._autres: List[Tuple[int, Any]] = []   # formes calculées avec aire()
+        self._n = 0
+        self.etendre(formes)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _ajouter_morceau(self, classe: type, parametres, positions) -> None:
+        self._parametres.setdefault(classe, []).append(parametres)
+        self._positions.setdefault(classe, []).append(positions)
+
+    def ajouter(self, forme: Any) -> None:
+        classe = type(forme)
+        if np is not None and classe in FORMES_ENREGISTREES:
+            valeur = getattr(forme, FORMES_ENREGISTREES[classe][0])
+            if _parametre_vectorisable(valeur):
+                morceaux = self._parametres.get(classe)
+                if not morceaux or not isinstance(morceaux[-1], list):
+                    self._ajouter_morceau(classe, [], [])
+                self._parametres[classe][-1].append(valeur)
+                self._positions[classe][-1].append(self._n)
+                self._n += 1
+                return
+        self._autres.append((self._n, forme))
+        self._n += 1
+
+    def etendre(self, formes: Iterable) -> None:
+        for forme in formes:
+            self.ajouter(forme)
+
+    def ajouter_tableau(self, classe: type, parametres) -> None:
+        """Ajoute len(parametres) formes d'un coup sans créer d'objets (ex. un tableau de rayons)."""
+        if np is None or classe not in FORMES_ENREGISTREES:
+            self.etendre(classe(p) for p in parametres)
+            return
+        parametres = np.asarray(parametres)
+        if not _dtype_vectorisable(parametres):
+            # grands entiers, float32, uint8, booléens, objets... : calculés forme par forme, comme aire()
+            self.etendre(classe(p) for p in (parametres.tolist() if parametres.dtype == np.int64 else parametres))
+            return
+        self._ajouter_morceau(classe, parametres.astype(np.float64), np.arange(self._n, self._n + len(parametres)))
+        self._n += len(parametres)
+
+    def aires(self):
+        """Aires dans l'ordre d'ajout : un tableau numpy (une liste si numpy n'est pas installé)."""
+        if np is None:
+            return [forme.aire() for _, forme in self._autres]
+        # scalaires numpy convertis en nombres Python avant le test (np.uint8, np.float32...)
+        autres = [(position, _nombre_python(forme.aire())) for position, forme in self._autres]
+        # un résultat de aire() qu'un float64 ne représente pas exactement (grand entier, Fraction...)
+        # est gardé tel quel dans un tableau d'objets ; NaN reste un float64
+        exacts = all(isinstance(aire, (int, float)) and (float(aire) == aire or np.isnan(aire)) for _, aire in autres)
+        aires = np.empty(self._n, dtype=np.float64 if exacts else object)
+        for classe, morceaux in self._parametres.items():
+            parametres = np.concatenate([np.asarray(m, dtype=np.float64) for m in morceaux])
+            positions = np.concatenate([np.asarray(p, dtype=np.intp) for p in self._positions[classe]])
+            aires[positions] = FORMES_ENREGISTREES[classe][1](parametres)
+        for position, aire in autres:
+            aires[position] = aire
+        return aires
+
+
+class Triangle:
+    """Forme non enregistrée (duck typing) : LotFormes se rabat sur aire()."""
+    def __init__(self, base: float, hauteur: float) -> None:
+        self.base = base
+        self.hauteur = hauteur
+
+    def aire(self) -> float:
+        return self.base * self.hauteur / 2
+
+
+def demo_lot_formes(n: int = 1_000_000) -> None:
+    print("\n--- Démonstration du calcul d'aires par lots (LotFormes) ---")
+    formes = [Cercle(3), Carre(4), Hexagone(2.5), Triangle(3, 4), Cercle(0.1), Carre(1.5)]
+    lot = LotFormes(formes)
+    print("Formes :", ", ".join(type(f).__name__ for f in formes))
+    print("Aires par lot    :", list(map(float, lot.aires())) if np is not None else lot.aires())
+    print("Aires une à une  :", [f.aire() for f in formes])
+    if np is None:
+        print("numpy n'est pas installé : toutes les aires sont calculées avec aire().")
+        return
+
+    rayons = np.random.default_rng(0).uniform(0, 10, n)
+    debut = time.perf_counter()
+    cercles = [Cercle(r) for r in rayons.tolist()]
+    une_a_une = [c.aire() for c in cercles]
+    duree_objets = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    grand_lot = LotFormes()
+    grand_lot.ajouter_tableau(Cercle, rayons)
+    par_lot = grand_lot.aires()
+    duree_lot = time.perf_counter() - debut
+    print(f"{n} cercles : objets + aire() {duree_objets:.3f} s, LotFormes {duree_lot:.3f} s, "
+          f"résultats identiques : {par_lot.tolist() == une_a_une}")
+
+
 # ===========================
 # 2) Surcharge des méthodes 
 # la surcharge d'une méthode n'existe pas nativement en Python.
@@ -182,6 +341,7 @@ def main():
         print("3) Redéfinition des méthodes (overriding) ")
         print("4) Généricité")
         print("5) Modularité")
+        print("6) Calcul d'aires par lots")
         print("0) Quitter")
         
         choice = input("Votre choix > ").strip()
@@ -196,6 +356,8 @@ def main():
             demo_genericitee()
         elif choice == "5":
             demo_modularite()
+        elif choice == "6":
+            demo_lot_formes()
         elif choice == "0":
             print("Fin du programme.")
             break
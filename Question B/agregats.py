@@ -0,0 +1,487 @@
+"""
+agregats.py
+Agrégats fusionnables utilisés par le mode flux de exo4_b.py.
+Chaque chunk du CSV produit un état partiel (compteurs, sommes, min/max,
+value_counts, médianes exactes ou approchées, valeurs fréquentes) qu'on fusionne avec les autres :
+la mémoire dépend de la taille des chunks, pas de la taille du fichier.
+"""
+
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from moteur_rapport import COLONNES_RAPPORT, GROUPES_PAR_DEFAUT
+
+
+class StatColonne:
+    """Nombre, valeurs manquantes, somme, somme des carrés, min et max d'une colonne numérique."""
+    def __init__(self) -> None:
+        self.n = 0
+        self.nuls = 0
+        self.somme = 0.0
+        self.somme_carres = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def mettre_a_jour(self, valeurs: Iterable) -> 'StatColonne':
+        valeurs = np.asarray(valeurs, dtype=float)
+        presentes = valeurs[~np.isnan(valeurs)]
+        self.nuls += len(valeurs) - len(presentes)
+        self.n += len(presentes)
+        if len(presentes) > 0:
+            self.somme += float(presentes.sum())
+            self.somme_carres += float(np.dot(presentes, presentes))
+            self.min = min(self.min, float(presentes.min()))
+            self.max = max(self.max, float(presentes.max()))
+        return self
+
+    def fusionner(self, autre: 'StatColonne') -> 'StatColonne':
+        self.n += autre.n
+        self.nuls += autre.nuls
+        self.somme += autre.somme
+        self.somme_carres += autre.somme_carres
+        self.min = min(self.min, autre.min)
+        self.max = max(self.max, autre.max)
+        return self
+
+    @property
+    def moyenne(self) -> float:
+        return self.somme / self.n if self.n > 0 else np.nan
+
+    @property
+    def ecart_type(self) -> float:
+        # écart-type corrigé (ddof=1) comme pandas
+        if self.n < 2:
+            return np.nan
+        variance = (self.somme_carres - self.somme * self.somme / self.n) / (self.n - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+
+class CompteurValeurs:
+    """value_counts fusionnable (la mémoire dépend du nombre de valeurs distinctes)."""
+    def __init__(self) -> None:
+        self.comptes = Counter()
+
+    def mettre_a_jour(self, serie: pd.Series) -> 'CompteurValeurs':
+        # clés et comptes en types Python natifs (value_counts renvoie des scalaires numpy)
+        self.comptes.update({(k.item() if isinstance(k, np.generic) else k): int(v)
+                             for k, v in serie.value_counts().items()})
+        return self
+
+    def fusionner(self, autre: 'CompteurValeurs') -> 'CompteurValeurs':
+        self.comptes.update(autre.comptes)
+        return self
+
+    def en_dict(self) -> Dict:
+        # même ordre que value_counts() : du plus fréquent au moins fréquent
+        return dict(self.comptes.most_common())
+
+    def mode(self):
+        if not self.comptes:
+            return np.nan
+        # en cas d'égalité, pandas renvoie la plus petite valeur
+        maximum = max(self.comptes.values())
+        return min(v for v, c in self.comptes.items() if c == maximum)
+
+
+class MedianeExacte:
+    """
+    Médiane exacte fusionnable : comptes des valeurs distinctes (mémoire = nombre de valeurs distinctes,
+    pas nombre de lignes). Les valeurs reçues sont gardées telles quelles jusqu'à seuil_brut,
+    puis compactées en comptes ; avec un seul lot, la médiane est calculée directement (np.median).
+    """
+    def __init__(self, seuil_brut: int = 1 << 22) -> None:
+        self.seuil_brut = seuil_brut
+        self.valeurs = np.empty(0)
+        self.comptes = np.empty(0, dtype=np.int64)
+        self._brut: List[np.ndarray] = []
+        self._n_brut = 0
+
+    @property
+    def n(self) -> int:
+        return int(self.comptes.sum()) + self._n_brut
+
+    def mettre_a_jour(self, valeurs: Iterable) -> 'MedianeExacte':
+        valeurs = np.asarray(valeurs, dtype=float)
+        valeurs = valeurs[~np.isnan(valeurs)]
+        self._brut.append(valeurs)
+        self._n_brut += len(valeurs)
+        if self._n_brut > self.seuil_brut:
+            self.compacter()
+        return self
+
+    def _ajouter_comptes(self, valeurs: np.ndarray, comptes: np.ndarray) -> None:
+        uniques, inverse = np.unique(np.concatenate([self.valeurs, valeurs]), return_inverse=True)
+        self.comptes = np.bincount(inverse, weights=np.concatenate([self.comptes, comptes]),
+                                   minlength=len(uniques)).astype(np.int64)
+        self.valeurs = uniques
+
+    def compacter(self) -> 'MedianeExacte':
+        if self._brut:
+            self._ajouter_comptes(*np.unique(np.concatenate(self._brut), return_counts=True))
+            self._brut, self._n_brut = [], 0
+        return self
+
+    def fusionner(self, autre: 'MedianeExacte') -> 'MedianeExacte':
+        self._brut.extend(autre._brut)
+        self._n_brut += autre._n_brut
+        if len(autre.valeurs):
+            self._ajouter_comptes(autre.valeurs, autre.comptes)
+        if self._n_brut > self.seuil_brut:
+            self.compacter()
+        return self
+
+    def mediane(self) -> float:
+        if not len(self.valeurs) and len(self._brut) == 1:
+            return float(np.median(self._brut[0])) if len(self._brut[0]) else np.nan
+        self.compacter()
+        # même définition que pandas : moyenne des deux valeurs centrales si n est pair
+        n = int(self.comptes.sum())
+        if n == 0:
+            return np.nan
+        cumul = np.cumsum(self.comptes)
+        bas = self.valeurs[np.searchsorted(cumul, (n - 1) // 2, side='right')]
+        haut = self.valeurs[np.searchsorted(cumul, n // 2, side='right')]
+        return float(np.mean([bas, haut]))
+
+
+class HeavyHitters:
+    """
+    Valeurs fréquentes (Misra-Gries) fusionnables : au plus `capacite` valeurs suivies,
+    chaque compte est sous-estimé d'au plus n / (capacite + 1).
+    Exact tant que le nombre de valeurs distinctes ne dépasse pas la capacité.
+    """
+    def __init__(self, capacite: int = 1000) -> None:
+        self.capacite = capacite
+        self.comptes = Counter()
+        self.n = 0
+
+    def _ajouter(self, comptes: Dict) -> None:
+        self.comptes.update(comptes)
+        if len(self.comptes) > self.capacite:
+            seuil = sorted(self.comptes.values(), reverse=True)[self.capacite]
+            self.comptes = Counter({v: c - seuil for v, c in self.comptes.items() if c > seuil})
+
+    def mettre_a_jour(self, serie: pd.Series) -> 'HeavyHitters':
+        comptes = serie.value_counts()
+        self.n += int(comptes.sum())
+        self._ajouter({(k.item() if isinstance(k, np.generic) else k): int(v) for k, v in comptes.items() if v > 0})
+        return self
+
+    def fusionner(self, autre: 'HeavyHitters') -> 'HeavyHitters':
+        self.n += autre.n
+        self._ajouter(autre.comptes)
+        return self
+
+    def mode(self):
+        if not self.comptes:
+            return np.nan
+        maximum = max(self.comptes.values())
+        return min(v for v, c in self.comptes.items() if c == maximum)
+
+
+class QuantileApprox:
+    """
+    Sketch KLL simplifié : le niveau h contient des éléments de poids 2**h.
+    Quand un niveau dépasse sa capacité, on le trie et on promeut un élément
+    sur deux au niveau suivant. Tant qu'aucune compaction n'a eu lieu,
+    les quantiles sont exacts (même résultat que pandas).
+    """
+    def __init__(self, k: int = 200, graine: int = 0) -> None:
+        self.k = k
+        self.n = 0
+        self.niveaux: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(graine)
+
+    def _capacite(self, h: int) -> int:
+        profondeur = len(self.niveaux) - h - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** profondeur)))
+
+    def _compacter(self) -> None:
+        h = 0
+        while h < len(self.niveaux):
+            if len(self.niveaux[h]) > self._capacite(h):
+                if h + 1 == len(self.niveaux):
+                    self.niveaux.append(np.empty(0))
+                niveau = np.sort(self.niveaux[h])
+                reste = niveau[:len(niveau) % 2]
+                promus = niveau[len(reste):][self._rng.integers(2)::2]
+                self.niveaux[h] = reste
+                self.niveaux[h + 1] = np.concatenate([self.niveaux[h + 1], promus])
+            h += 1
+
+    def mettre_a_jour(self, valeurs: Iterable) -> 'QuantileApprox':
+        valeurs = np.asarray(valeurs, dtype=float)
+        valeurs = valeurs[~np.isnan(valeurs)]
+        self.n += len(valeurs)
+        self.niveaux[0] = np.concatenate([self.niveaux[0], valeurs])
+        self._compacter()
+        return self
+
+    def fusionner(self, autre: 'QuantileApprox') -> 'QuantileApprox':
+        while len(self.niveaux) < len(autre.niveaux):
+            self.niveaux.append(np.empty(0))
+        for h, niveau in enumerate(autre.niveaux):
+            self.niveaux[h] = np.concatenate([self.niveaux[h], niveau])
+        self.n += autre.n
+        self._compacter()
+        return self
+
+    @property
+    def exact(self) -> bool:
+        return len(self.niveaux) == 1
+
+    def quantile(self, q: float) -> float:
+        if self.n == 0:
+            return np.nan
+        if self.exact:
+            return float(np.quantile(self.niveaux[0], q))
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(len(niv), 2.0 ** h) for h, niv in enumerate(self.niveaux)])
+        ordre = np.argsort(valeurs, kind='stable')
+        cumul = np.cumsum(poids[ordre])
+        i = np.searchsorted(cumul, q * cumul[-1])
+        return float(valeurs[ordre][min(i, len(ordre) - 1)])
+
+    def mediane(self) -> float:
+        return self.quantile(0.5)
+
+
+class TopK:
+    """Les k plus grandes valeurs d'une colonne (équivalent fusionnable de nlargest)."""
+    def __init__(self, k: int, colonne: str, autres: Optional[List[str]] = None) -> None:
+        self.k = k
+        self.colonne = colonne
+        self.colonnes = (autres or []) + [colonne]
+        self.meilleurs = pd.DataFrame(columns=self.colonnes)
+
+    def mettre_a_jour(self, chunk: pd.DataFrame) -> 'TopK':
+        candidats = chunk.nlargest(self.k, self.colonne)[self.colonnes]
+        self.meilleurs = candidats if self.meilleurs.empty else pd.concat([self.meilleurs, candidats])
+        self.meilleurs = self.meilleurs.nlargest(self.k, self.colonne)
+        return self
+
+    def fusionner(self, autre: 'TopK') -> 'TopK':
+        return self.mettre_a_jour(autre.meilleurs)
+
+
+class VueListe(Sequence):
+    """
+    Vue en lecture seule des n premiers éléments d'une liste qui ne fait que grandir (extend) :
+    instantané en O(1), sans copie. list(vue) en fait une copie modifiable.
+    """
+    def __init__(self, liste: list, n: Optional[int] = None) -> None:
+        self._liste = liste
+        self._n = len(liste) if n is None else n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._liste[slice(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("indice hors de la vue")
+        return self._liste[i]
+
+    def __eq__(self, autre) -> bool:
+        if isinstance(autre, (list, tuple, VueListe)):
+            return len(self) == len(autre) and list(self) == list(autre)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class EtatRapport:
+    """
+    État fusionnable qui contient tout ce dont generer_rapport a besoin :
+    on peut le construire chunk par chunk puis produire le même dictionnaire.
+    """
+    colonnes_moyennes = COLONNES_RAPPORT
+
+    def __init__(self, groupes: Optional[Dict[str, Tuple[str, Any]]] = None, seuil_hypertension: float = 140) -> None:
+        self.groupes = GROUPES_PAR_DEFAUT if groupes is None else groupes
+        self.seuil_hypertension = seuil_hypertension
+        self.n = 0
+        self.stats = {col: StatColonne() for col in self.colonnes_moyennes}
+        self.sexes = CompteurValeurs()
+        self.labels = CompteurValeurs()
+        self.n_groupes = {nom: 0 for nom in self.groupes}
+        self.age_groupes = {nom: StatColonne() for nom in self.groupes}
+        self.ids_groupes: Dict[str, List] = {nom: [] for nom in self.groupes}
+        self.hypertendus = 0
+
+    def mettre_a_jour(self, chunk: pd.DataFrame) -> 'EtatRapport':
+        self.n += len(chunk)
+        for col, stat in self.stats.items():
+            stat.mettre_a_jour(chunk[col])
+        self.sexes.mettre_a_jour(chunk['sexe'])
+        self.labels.mettre_a_jour(chunk['label'])
+        ages = chunk['age'].to_numpy(dtype=float, na_value=np.nan)
+        ids = chunk['patientId'].to_numpy()
+        for nom, (col, val) in self.groupes.items():
+            masque = (chunk[col] == val).to_numpy(dtype=bool, na_value=False)
+            self.n_groupes[nom] += int(masque.sum())
+            self.age_groupes[nom].mettre_a_jour(ages[masque])
+            self.ids_groupes[nom].extend(ids[masque].tolist())
+        self.hypertendus += int((chunk['tensionSystolique'] > self.seuil_hypertension).sum())
+        return self
+
+    def fusionner(self, autre: 'EtatRapport') -> 'EtatRapport':
+        self.n += autre.n
+        for col, stat in self.stats.items():
+            stat.fusionner(autre.stats[col])
+        self.sexes.fusionner(autre.sexes)
+        self.labels.fusionner(autre.labels)
+        for nom in self.groupes:
+            self.n_groupes[nom] += autre.n_groupes[nom]
+            self.age_groupes[nom].fusionner(autre.age_groupes[nom])
+            self.ids_groupes[nom].extend(autre.ids_groupes[nom])
+        self.hypertendus += autre.hypertendus
+        return self
+
+    def rapport(self, vues: bool = False) -> Dict:
+        # vues=True : listes d'identifiants en VueListe, pour le cache interne des rapports
+        age = self.stats['age']
+        groupes = {
+            nom: {
+                'nombre': self.n_groupes[nom],
+                'pourcentage': self.n_groupes[nom] / self.n * 100 if self.n > 0 else 0,
+                'age_moyen': self.age_groupes[nom].moyenne if self.n_groupes[nom] > 0 else 0,
+                # ids_groupes ne fait que grandir : une vue suffit, sans copier O(N) à chaque rapport
+                'liste_ids': VueListe(self.ids_groupes[nom]) if vues else list(self.ids_groupes[nom])
+            }
+            for nom in self.groupes
+        }
+        return {
+            'resume_general': {
+                'nombre_total_patients': self.n,
+                'age_moyen': age.moyenne,
+                'age_min': age.min if age.n > 0 else np.nan,
+                'age_max': age.max if age.n > 0 else np.nan,
+                'ratio_hommes_femmes': f"{self.sexes.comptes['M']}:{self.sexes.comptes['F']}",
+                'imc_moyen': self.stats['imc'].moyenne
+            },
+            'distribution_labels': self.labels.en_dict(),
+            **groupes,
+            'statistiques_sante': {
+                'tension_moyenne': f"{self.stats['tensionSystolique'].moyenne:.0f}/{self.stats['tensionDiastolique'].moyenne:.0f}",
+                'cholesterol_moyen': self.stats['cholesterol'].moyenne,
+                'glucose_moyen': self.stats['glucose'].moyenne,
+                'patients_hypertendus': self.hypertendus
+            }
+        }
+
+
+class EtatImputation:
+    """
+    Médianes (colonnes numériques) et modes (autres colonnes) fusionnables entre chunks et processus.
+    approx=False : MedianeExacte / CompteurValeurs ; approx=True : QuantileApprox / HeavyHitters (mémoire bornée).
+    Sans liste de colonnes, elles sont déduites des types du premier lot.
+    par : colonne de regroupement (ex. 'label') ; un état est alors tenu pour chaque groupe en plus de l'état global.
+    """
+    def __init__(self, colonnes_num: Optional[List[str]] = None, colonnes_cat: Optional[List[str]] = None,
+                 approx: bool = False, precision_k: int = 1000, capacite_modes: int = 1000,
+                 par: Optional[str] = None, colonnes_ignorees: Tuple[str, ...] = ()) -> None:
+        self.colonnes_num = colonnes_num
+        self.colonnes_cat = colonnes_cat
+        self.approx = approx
+        self.precision_k = precision_k
+        self.capacite_modes = capacite_modes
+        self.par = par
+        self.colonnes_ignorees = colonnes_ignorees
+        self.nuls: Counter = Counter()
+        self.medianes: Dict[str, Any] = {}
+        self.modes: Dict[str, Any] = {}
+        self.groupes: Dict[Any, 'EtatImputation'] = {}
+        self._valeurs: Optional[Dict] = None   # mémoïsées jusqu'à la prochaine mise à jour
+
+    def _colonnes(self, df: pd.DataFrame) -> None:
+        if self.colonnes_num is None:
+            colonnes = [col for col in df.columns if col not in self.colonnes_ignorees]
+            self.colonnes_num = [col for col in colonnes if pd.api.types.is_numeric_dtype(df[col])]
+            self.colonnes_cat = [col for col in colonnes if col not in self.colonnes_num]
+
+    def _groupe(self, valeur) -> 'EtatImputation':
+        if valeur not in self.groupes:
+            self.groupes[valeur] = EtatImputation(
+                [c for c in self.colonnes_num if c != self.par], [c for c in self.colonnes_cat if c != self.par],
+                self.approx, self.precision_k, self.capacite_modes)
+        return self.groupes[valeur]
+
+    def mettre_a_jour(self, df: pd.DataFrame) -> 'EtatImputation':
+        self._colonnes(df)
+        self._valeurs = None
+        for col in self.colonnes_num:
+            serie = df[col]
+            self.nuls[col] += int(serie.isna().sum())
+            if col not in self.medianes:
+                self.medianes[col] = QuantileApprox(k=self.precision_k) if self.approx else MedianeExacte()
+            self.medianes[col].mettre_a_jour(serie)
+        for col in self.colonnes_cat:
+            serie = df[col]
+            self.nuls[col] += int(serie.isna().sum())
+            if col not in self.modes:
+                self.modes[col] = HeavyHitters(self.capacite_modes) if self.approx else CompteurValeurs()
+            self.modes[col].mettre_a_jour(serie)
+        if self.par is not None:
+            for valeur, lignes in df.groupby(self.par, observed=True, sort=False).indices.items():
+                self._groupe(valeur.item() if isinstance(valeur, np.generic) else valeur).mettre_a_jour(df.iloc[lignes])
+        return self
+
+    def fusionner(self, autre: 'EtatImputation') -> 'EtatImputation':
+        if self.colonnes_num is None:
+            self.colonnes_num, self.colonnes_cat = autre.colonnes_num, autre.colonnes_cat
+        self._valeurs = None
+        self.nuls.update(autre.nuls)
+        for col, mediane in autre.medianes.items():
+            self.medianes[col] = self.medianes[col].fusionner(mediane) if col in self.medianes else mediane
+        for col, mode in autre.modes.items():
+            self.modes[col] = self.modes[col].fusionner(mode) if col in self.modes else mode
+        for valeur, groupe in autre.groupes.items():
+            self.groupes[valeur] = self.groupes[valeur].fusionner(groupe) if valeur in self.groupes else groupe
+        return self
+
+    def compacter(self) -> 'EtatImputation':
+        # avant l'envoi entre processus : les valeurs brutes deviennent des comptes
+        for mediane in self.medianes.values():
+            if isinstance(mediane, MedianeExacte):
+                mediane.compacter()
+        for groupe in self.groupes.values():
+            groupe.compacter()
+        return self
+
+    def valeurs(self) -> Dict:
+        if self._valeurs is None:
+            self._valeurs = {col: mediane.mediane() for col, mediane in self.medianes.items()}
+            self._valeurs.update({col: mode.mode() for col, mode in self.modes.items()})
+        return self._valeurs
+
+    def valeurs_par_groupe(self) -> Dict[Any, Dict]:
+        return {valeur: groupe.valeurs() for valeur, groupe in self.groupes.items()}
+
+
+class EtatIncremental:
+    """
+    État maintenu par ajouter_patients : agrégats du rapport, sketches des médianes
+    d'imputation et modes des colonnes catégorielles. Chaque lot coûte O(taille du lot).
+    """
+    def __init__(self, groupes: Optional[Dict[str, Tuple[str, Any]]] = None,
+                 imputation: Optional[EtatImputation] = None) -> None:
+        self.rapport = EtatRapport(groupes)
+        self.imputation = imputation if imputation is not None else \
+            EtatImputation(approx=True, colonnes_ignorees=('patientId',))
+
+    def mettre_a_jour(self, lot: pd.DataFrame) -> 'EtatIncremental':
+        self.rapport.mettre_a_jour(lot)
+        self.imputation.mettre_a_jour(lot)
+        return self
+
+    def valeurs_imputation(self) -> Dict:
+        return self.imputation.valeurs()
@@ -0,0 +1,102 @@
+"""
+analyse_groupes.py
+Profil de tous les groupes d'une colonne (tous les labels, toutes les catégories de risque...)
+en une seule passe groupby, au lieu d'un appel à analyser_patients par valeur.
+Le top-k IMC de chaque groupe utilise une sélection partielle (np.argpartition).
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+COLONNES_STATS = ['age', 'poids', 'taille', 'imc', 'tensionSystolique', 'tensionDiastolique', 'cholesterol', 'glucose']
+COLONNES_COMPARAISON = ['age', 'imc', 'tensionSystolique']
+
+
+@dataclass
+class ResultatGroupes:
+    colonne: str
+    effectifs: pd.Series
+    pourcentages: pd.Series
+    statistiques: pd.DataFrame      # index : groupe, colonnes : (variable, stat) comme describe()
+    moyennes_population: pd.Series
+    comparaison: pd.DataFrame       # écart (%) entre la moyenne du groupe et la population
+    distribution_sexe: pd.DataFrame
+    top_imc: Dict[Any, pd.DataFrame] = field(default_factory=dict)
+
+    def groupe(self, val) -> Dict:
+        return {
+            'nombre': int(self.effectifs[val]),
+            'pourcentage': float(self.pourcentages[val]),
+            'statistiques': self.statistiques.loc[val].unstack(),
+            'comparaison': self.comparaison.loc[val],
+            'distribution_sexe': self.distribution_sexe.loc[val],
+            'top_imc': self.top_imc[val]
+        }
+
+    def afficher(self) -> None:
+        print(f"\nAnalyse des patients par {self.colonne}")
+        print("-"*30)
+        print(pd.DataFrame({'nombre': self.effectifs, 'pourcentage': self.pourcentages.round(1)}))
+        print(f"\nMoyennes par groupe :")
+        print(self.statistiques.xs('mean', axis=1, level=1).round(2))
+        print(f"\nDiff avec la population générale (%) :")
+        print(self.comparaison.round(2))
+        print(f"\nDistribution par sexe :")
+        print(self.distribution_sexe)
+        for val, top in self.top_imc.items():
+            print(f"\nTop {len(top)} IMC pour {self.colonne} = {val} :")
+            print(top.to_string(index=False))
+
+
+def _top_k_par_groupe(codes: np.ndarray, valeurs: np.ndarray, ids: np.ndarray, k: int,
+                      groupes: List) -> Dict[Any, pd.DataFrame]:
+    # un seul tri stable pour tous les groupes, puis sélection partielle dans chaque tranche
+    ordre = np.argsort(codes, kind='stable')
+    bornes = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(groupes)))]) + int((codes < 0).sum())
+    resultat = {}
+    for g, val in enumerate(groupes):
+        tranche = ordre[bornes[g]:bornes[g + 1]]
+        tranche = tranche[~np.isnan(valeurs[tranche])]
+        if len(tranche) > k:
+            tranche = tranche[np.argpartition(-valeurs[tranche], k - 1)[:k]]
+        tranche = tranche[np.argsort(-valeurs[tranche], kind='stable')]
+        resultat[val] = pd.DataFrame({'patientId': ids[tranche], 'imc': valeurs[tranche]})
+    return resultat
+
+
+def analyser_groupes(df: pd.DataFrame, col: str, k: int = 5, ids: np.ndarray = None) -> ResultatGroupes:
+    codes, groupes = pd.factorize(df[col], sort=True)
+    groupes = list(groupes)
+    par_groupe = df[COLONNES_STATS].groupby(codes)
+
+    # describe() en agrégations cythonisées (groupby.describe repasse par chaque groupe)
+    agregats = par_groupe.agg(['count', 'mean', 'std', 'min', 'max'])
+    quantiles = par_groupe.quantile([0.25, 0.5, 0.75]).unstack()
+    quantiles.columns = quantiles.columns.set_levels(['25%', '50%', '75%'], level=1)
+    statistiques = pd.concat([agregats, quantiles], axis=1)
+    ordre_stats = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+    statistiques = statistiques[[(c, s) for c in COLONNES_STATS for s in ordre_stats]]
+    statistiques = statistiques.drop(index=-1, errors='ignore')
+    statistiques.index = [groupes[i] for i in statistiques.index]
+
+    effectifs = pd.Series(np.bincount(codes[codes >= 0], minlength=len(groupes)), index=groupes)
+    pourcentages = effectifs / len(df) * 100 if len(df) > 0 else effectifs.astype(float)
+
+    moyennes_pop = df[COLONNES_COMPARAISON].mean()
+    moyennes_grp = statistiques.xs('mean', axis=1, level=1)[COLONNES_COMPARAISON]
+    comparaison = (moyennes_grp - moyennes_pop) / moyennes_pop * 100
+
+    distribution_sexe = pd.crosstab(codes, df['sexe'].to_numpy()).drop(index=-1, errors='ignore')
+    distribution_sexe.index = [groupes[i] for i in distribution_sexe.index]
+    distribution_sexe.columns.name = 'sexe'
+
+    if ids is None:
+        ids = df['patientId'].to_numpy() if 'patientId' in df.columns else np.arange(len(df))
+    top_imc = _top_k_par_groupe(codes, df['imc'].to_numpy(dtype=float, na_value=np.nan), ids, k, groupes)
+
+    return ResultatGroupes(col, effectifs, pourcentages, statistiques, moyennes_pop,
+                           comparaison, distribution_sexe, top_imc)
@@ -0,0 +1,139 @@
+"""
+benchmark.py
+Mesure du temps et du pic mémoire de chaque étape de AnalyseurDonnees
+sur des données générées à plusieurs tailles, avec sauvegarde en JSON
+et comparaison avec une référence (détection des ralentissements).
+
+    python benchmark.py --tailles 1000 10000 100000 --sortie bench.json
+    python benchmark.py --tailles 1000 10000 --comparer bench.json --seuil 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from exo4_b import AnalyseurDonnees
+
+
+ETAPES = ['sauvegarder_donness', 'charger_donnees', 'nettoyer_donnees', 'analyser_patients',
+          'generer_rapport', 'export_rapport', 'display_donnees']
+
+
+def _actions(analyseur: AnalyseurDonnees, dossier: str, dpi: int) -> Dict[str, Callable]:
+    csv = os.path.join(dossier, 'donnees_patients.csv')
+    return {
+        'sauvegarder_donness': lambda: analyseur.sauvegarder_donness(csv),
+        'charger_donnees': lambda: analyseur.charger_donnees(csv),
+        'nettoyer_donnees': lambda: analyseur.nettoyer_donnees(),
+        'analyser_patients': lambda: analyseur.analyser_patients('label', 4),
+        # cache vidé avant chaque mesure : on mesure le calcul et la sérialisation, pas un hit
+        'generer_rapport': lambda: (analyseur.cache_rapports.vider(), analyseur.generer_rapport()),
+        'export_rapport': lambda: (analyseur.cache_rapports.vider(),
+                                   analyseur.export_rapport(os.path.join(dossier, 'rapport_analyse.json'))),
+        'display_donnees': lambda: analyseur.display_donnees(show_plot=False, dpi=dpi,
+                                                             filename=os.path.join(dossier, 'analyse_patients.png')),
+    }
+
+
+def mesurer(action: Callable, repetitions: int) -> Dict:
+    # temps : meilleur de n exécutions sans tracemalloc (qui ralentit les allocations),
+    # puis une exécution séparée pour le pic mémoire
+    temps = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        action()
+        temps.append(time.perf_counter() - debut)
+    tracemalloc.start()
+    action()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'temps_s': min(temps), 'memoire_pic_mo': pic / 2**20}
+
+
+def executer(tailles: List[int], etapes: List[str], repetitions: int = 3, dpi: int = 72) -> Dict:
+    import matplotlib
+    matplotlib.use('Agg')
+
+    resultats = {}
+    for n in tailles:
+        analyseur = AnalyseurDonnees()
+        with tempfile.TemporaryDirectory() as dossier, contextlib.redirect_stdout(io.StringIO()):
+            analyseur.generer_donnees_exemple(n)
+            actions = _actions(analyseur, dossier, dpi)
+            # les étapes sont exécutées dans l'ordre du pipeline (chacune prépare la suivante)
+            resultats[str(n)] = {etape: mesurer(actions[etape], repetitions) for etape in ETAPES if etape in etapes}
+        print(f"{n} patients :")
+        for etape, mesure in resultats[str(n)].items():
+            print(f"\t{etape:<20} {mesure['temps_s']*1000:10.1f} ms {mesure['memoire_pic_mo']:10.1f} Mo")
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'repetitions': repetitions,
+        },
+        'resultats': resultats
+    }
+
+
+def comparer(actuel: Dict, reference: Dict, seuil: float = 0.2) -> List[str]:
+    """Liste des (taille, étape, mesure) qui dépassent la référence de plus de `seuil` (0.2 = +20%)."""
+    regressions = []
+    for n, etapes in actuel['resultats'].items():
+        for etape, mesure in etapes.items():
+            ref = reference['resultats'].get(n, {}).get(etape)
+            if ref is None:
+                continue
+            for cle in ('temps_s', 'memoire_pic_mo'):
+                if ref[cle] > 0 and mesure[cle] > ref[cle] * (1 + seuil):
+                    regressions.append(f"{n} patients, {etape}, {cle} : {ref[cle]:.4g} -> {mesure[cle]:.4g} "
+                                       f"(+{(mesure[cle] / ref[cle] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark des étapes de AnalyseurDonnees")
+    parser.add_argument('--tailles', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="nombres de patients (jusqu'à 10**8 si la machine le permet)")
+    parser.add_argument('--etapes', nargs='+', default=ETAPES, choices=ETAPES)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--dpi', type=int, default=72)
+    parser.add_argument('--sortie', help="fichier JSON où écrire les résultats")
+    parser.add_argument('--comparer', help="fichier JSON de référence")
+    parser.add_argument('--seuil', type=float, default=0.2, help="ralentissement toléré (0.2 = +20%%)")
+    args = parser.parse_args(argv)
+
+    resultats = executer(args.tailles, args.etapes, args.repetitions, args.dpi)
+    if args.sortie:
+        with open(args.sortie, 'w') as f:
+            json.dump(resultats, f, indent=2)
+        print(f"Résultats sauvegardés dans '{args.sortie}'")
+
+    if args.comparer:
+        with open(args.comparer) as f:
+            regressions = comparer(resultats, json.load(f), args.seuil)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de +{args.seuil*100:.0f}% :")
+            for ligne in regressions:
+                print(f"\t{ligne}")
+            return 1
+        print("\nAucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+cache_colonnes.py
+Sauvegarde / chargement binaire en colonnes des données patients avec un schéma compact
+(int8/int16 pour label et age, float32 pour les mesures, catégories pour sexe et catRisque).
+Parquet ou Feather si pyarrow est installé, sinon NPZ (numpy seul).
+Le cache d'un CSV est invalidé automatiquement quand le CSV change (taille ou date de modification).
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (seulement pour savoir si parquet/feather sont disponibles)
+except ImportError:
+    pyarrow = None
+
+
+CATEGORIES_RISQUE = ['Normal', 'Préhypertension', 'Hypertension stade 1', 'Hypertension stade 2']
+
+SCHEMA_COMPACT: Dict[str, object] = {
+    'age': 'Int16',
+    'sexe': 'category',
+    'poids': 'float32',
+    'taille': 'float32',
+    'tensionSystolique': 'float32',
+    'tensionDiastolique': 'float32',
+    'cholesterol': 'float32',
+    'glucose': 'float32',
+    'label': 'Int8',
+    'imc': 'float32',
+    'catRisque': pd.CategoricalDtype(CATEGORIES_RISQUE, ordered=True),
+}
+
+FORMATS = ('parquet', 'feather', 'npz')
+
+
+def format_par_defaut() -> str:
+    return 'parquet' if pyarrow is not None else 'npz'
+
+
+def appliquer_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes connues vers le schéma compact (les autres sont laissées telles quelles)."""
+    colonnes = {}
+    for col, dtype in SCHEMA_COMPACT.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        try:
+            colonnes[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            # valeurs non entières (ex: médiane x.5 après nettoyage) : on reste en flottant
+            colonnes[col] = df[col].astype('float32')
+    return df.assign(**colonnes) if colonnes else df
+
+
+def _ecrire_npz(df: pd.DataFrame, path: str) -> None:
+    tableaux = {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            tableaux[f'{col}.codes'] = serie.cat.codes.to_numpy()
+            tableaux[f'{col}.categories'] = np.asarray(serie.cat.categories.astype(str), dtype=str)
+            tableaux[f'{col}.ordonne'] = np.array(serie.cat.ordered)
+        elif pd.api.types.is_extension_array_dtype(serie.dtype) and pd.api.types.is_integer_dtype(serie.dtype):
+            tableaux[f'{col}.valeurs'] = serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0)
+            tableaux[f'{col}.nuls'] = serie.isna().to_numpy()
+        elif pd.api.types.is_numeric_dtype(serie.dtype):
+            tableaux[f'{col}.valeurs'] = serie.to_numpy()
+        else:
+            tableaux[f'{col}.valeurs'] = serie.fillna('').to_numpy(dtype=str)
+            tableaux[f'{col}.nuls'] = serie.isna().to_numpy()
+    tableaux['__colonnes__'] = np.asarray(df.columns, dtype=str)
+    tableaux['__dtypes__'] = np.asarray([str(t) for t in df.dtypes], dtype=str)
+    with open(path, 'wb') as f:
+        np.savez(f, **tableaux)
+
+
+def _lire_npz(path: str, colonnes: Optional[List[str]] = None) -> pd.DataFrame:
+    # NpzFile ne décompresse un tableau qu'au moment où on y accède : projection gratuite
+    with np.load(path, allow_pickle=False) as npz:
+        toutes = npz['__colonnes__'].tolist()
+        dtypes = dict(zip(toutes, npz['__dtypes__'].tolist()))
+        data = {}
+        for col in (colonnes or toutes):
+            if col not in dtypes:
+                raise KeyError(f"Colonne '{col}' absente de {path}")
+            if dtypes[col] == 'category':
+                data[col] = pd.Categorical.from_codes(npz[f'{col}.codes'], npz[f'{col}.categories'].tolist(),
+                                                      ordered=bool(npz[f'{col}.ordonne']))
+            elif f'{col}.nuls' in npz.files and pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtypes[col])):
+                data[col] = pd.arrays.IntegerArray(npz[f'{col}.valeurs'], npz[f'{col}.nuls'])
+            elif f'{col}.nuls' in npz.files:
+                valeurs = npz[f'{col}.valeurs'].astype(object)
+                valeurs[npz[f'{col}.nuls']] = np.nan
+                data[col] = valeurs
+            else:
+                data[col] = npz[f'{col}.valeurs']
+    return pd.DataFrame(data)
+
+
+def ecrire_colonnes(df: pd.DataFrame, path: str, format: Optional[str] = None) -> None:
+    format = format or format_par_defaut()
+    df = appliquer_schema(df)
+    if format == 'npz':
+        _ecrire_npz(df, path)
+    elif pyarrow is None:
+        raise ImportError(f"pyarrow est nécessaire pour le format '{format}' (utiliser 'npz' sinon)")
+    elif format == 'parquet':
+        df.to_parquet(path, index=False)
+    elif format == 'feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Format inconnu : {format} (formats possibles : {', '.join(FORMATS)})")
+
+
+def format_depuis_chemin(path: str) -> Optional[str]:
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else None
+
+
+def lire_colonnes(path: str, colonnes: Optional[List[str]] = None) -> pd.DataFrame:
+    format = format_depuis_chemin(path)
+    if format == 'npz':
+        return _lire_npz(path, colonnes)
+    if format == 'parquet':
+        return pd.read_parquet(path, columns=colonnes)
+    if format == 'feather':
+        return pd.read_feather(path, columns=colonnes, memory_map=True)
+    raise ValueError(f"Format binaire non reconnu pour {path}")
+
+
+def _empreinte_source(path: str) -> Dict:
+    infos = os.stat(path)
+    return {'taille': infos.st_size, 'mtime_ns': infos.st_mtime_ns}
+
+
+def chemin_cache(path_csv: str, format: Optional[str] = None) -> str:
+    return f'{os.path.splitext(path_csv)[0]}.cache.{format or format_par_defaut()}'
+
+
+def lire_csv_avec_cache(path_csv: str, colonnes: Optional[List[str]] = None,
+                        format: Optional[str] = None) -> pd.DataFrame:
+    """Lit le cache binaire du CSV s'il est à jour, sinon relit le CSV et reconstruit le cache."""
+    cache = chemin_cache(path_csv, format)
+    meta = cache + '.json'
+    empreinte = _empreinte_source(path_csv)
+    if os.path.exists(cache) and os.path.exists(meta):
+        with open(meta) as f:
+            if json.load(f) == empreinte:
+                return lire_colonnes(cache, colonnes)
+
+    df = appliquer_schema(pd.read_csv(path_csv))
+    ecrire_colonnes(df, cache, format)
+    with open(meta, 'w') as f:
+        json.dump(empreinte, f)
+    return df[colonnes] if colonnes else df
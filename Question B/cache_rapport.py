@@ -0,0 +1,113 @@
+"""
+cache_rapport.py
+Cache des rapports de generer_rapport / export_rapport.
+La clé combine une empreinte peu coûteuse des données (compteur de modifications de l'analyseur,
+taille, colonnes et hachage d'un échantillon fixe de lignes) et les paramètres du rapport.
+Chaque entrée garde le rapport et, dès qu'il a été demandé une fois, son JSON déjà sérialisé :
+un export sur des données inchangées écrit directement ces octets.
+Éviction LRU bornée par le nombre d'entrées et par la taille totale.
+"""
+
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+TAILLE_ECHANTILLON = 1024   # lignes hachées pour l'empreinte (détecte la plupart des modifications en place)
+
+
+def empreinte(df: pd.DataFrame, version: int = 0) -> Tuple:
+    """Empreinte en O(TAILLE_ECHANTILLON) : version de l'analyseur, forme, colonnes et échantillon de lignes."""
+    if df is None:
+        return (version, None)
+    lignes = np.unique(np.linspace(0, len(df) - 1, min(len(df), TAILLE_ECHANTILLON)).astype(np.int64))
+    hachage = pd.util.hash_pandas_object(df.iloc[lignes], index=False).to_numpy()
+    return (version, len(df), tuple(df.columns), tuple(map(str, df.dtypes)),
+            int(np.bitwise_xor.reduce(hachage * np.arange(1, len(hachage) + 1, dtype=np.uint64))) if len(hachage) else 0)
+
+
+def _cle_parametres(groupes: Optional[Dict]) -> Tuple:
+    return None if groupes is None else tuple(sorted((nom, col, val) for nom, (col, val) in groupes.items()))
+
+
+def _taille_estimee(rapport: Dict) -> int:
+    # avant sérialisation : les listes d'identifiants dominent la taille du JSON
+    return 1024 + sum(12 * len(section.get('liste_ids', ())) for section in rapport.values() if isinstance(section, dict))
+
+
+_TYPES_IMBRIQUES = {dict, list, np.ndarray}
+
+
+def copie_rapport(obj):
+    """Copie du rapport gardé en cache : dicts, listes, tableaux et vues (VueListe) recopiés en types natifs."""
+    if isinstance(obj, dict):
+        return {cle: copie_rapport(valeur) for cle, valeur in obj.items()}
+    if isinstance(obj, list):
+        # rapports en types natifs : test sur les types exacts, sans boucle Python sur les identifiants
+        if not _TYPES_IMBRIQUES.isdisjoint(map(type, obj)):
+            return [copie_rapport(valeur) for valeur in obj]
+        return list(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    if isinstance(obj, Sequence) and not isinstance(obj, (str, bytes, tuple)):
+        return list(obj)
+    return obj
+
+
+class EntreeRapport:
+    def __init__(self, rapport: Dict) -> None:
+        self.rapport = rapport
+        self.json: Dict[Hashable, bytes] = {}   # octets sérialisés par format d'export
+
+    @property
+    def taille(self) -> int:
+        return _taille_estimee(self.rapport) + sum(len(octets) for octets in self.json.values())
+
+
+class CacheRapports:
+    def __init__(self, max_entrees: int = 16, max_octets: int = 256 * 2**20) -> None:
+        self.max_entrees = max_entrees
+        self.max_octets = max_octets
+        self._entrees: 'OrderedDict[Tuple, EntreeRapport]' = OrderedDict()
+        self.hits = 0
+        self.miss = 0
+
+    def cle(self, df: pd.DataFrame, version: int, groupes: Optional[Dict] = None, *options: Hashable) -> Tuple:
+        return (empreinte(df, version), _cle_parametres(groupes)) + options
+
+    def cle_version(self, version: int, groupes: Optional[Dict] = None, *options: Hashable) -> Tuple:
+        # rapport tiré de l'état incrémental : la version suffit, sans empreinte O(N) des données
+        return (('version', version), _cle_parametres(groupes)) + options
+
+    def obtenir(self, cle: Tuple) -> Optional[EntreeRapport]:
+        entree = self._entrees.get(cle)
+        if entree is None:
+            self.miss += 1
+            return None
+        self.hits += 1
+        self._entrees.move_to_end(cle)
+        return entree
+
+    def ajouter(self, cle: Tuple, rapport: Dict) -> EntreeRapport:
+        self._entrees[cle] = entree = EntreeRapport(rapport)
+        self._entrees.move_to_end(cle)
+        self.limiter()
+        return entree
+
+    @property
+    def taille(self) -> int:
+        return sum(entree.taille for entree in self._entrees.values())
+
+    def limiter(self) -> None:
+        # on garde toujours l'entrée la plus récente, même si elle dépasse seule la borne
+        while len(self._entrees) > 1 and (len(self._entrees) > self.max_entrees or self.taille > self.max_octets):
+            self._entrees.popitem(last=False)
+
+    def vider(self) -> None:
+        self._entrees.clear()
+
+    def __len__(self) -> int:
+        return len(self._entrees)
@@ -0,0 +1,95 @@
+"""
+colonnes_derivees.py
+Déclaration des colonnes calculées (imc, catRisque) et de leurs colonnes sources.
+Les colonnes dérivées ne sont plus calculées à la génération ni lues telles quelles depuis le CSV :
+elles sont calculées au premier accès, mémoïsées, et recalculées seulement quand une
+de leurs sources change (nettoyage, ajout de patients, nouveau chargement).
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from cache_colonnes import CATEGORIES_RISQUE
+
+
+class ColonneDerivee:
+    def __init__(self, nom: str, sources: Tuple[str, ...], calcul: Callable[[pd.DataFrame], pd.Series]) -> None:
+        self.nom = nom
+        self.sources = sources
+        self.calcul = calcul
+
+
+def _imc(df: pd.DataFrame) -> pd.Series:
+    return (df['poids'] / (df['taille'] / 100) ** 2).round(2)
+
+
+def _categorie_risque(df: pd.DataFrame) -> pd.Series:
+    # https://fr.wikipedia.org/wiki/Hypertension_artérielle#Définition
+    return pd.cut(df['tensionSystolique'], bins=[0, 120, 140, 160, 300], labels=CATEGORIES_RISQUE)
+
+
+COLONNES_DERIVEES: Dict[str, ColonneDerivee] = {
+    'imc': ColonneDerivee('imc', ('poids', 'taille'), _imc),
+    'catRisque': ColonneDerivee('catRisque', ('tensionSystolique',), _categorie_risque),
+}
+
+
+def sources_necessaires(colonnes: Iterable[str]) -> List[str]:
+    """Remplace les colonnes dérivées par leurs sources (pour usecols / la projection)."""
+    resultat = []
+    for col in colonnes:
+        for source in (COLONNES_DERIVEES[col].sources if col in COLONNES_DERIVEES else (col,)):
+            if source not in resultat:
+                resultat.append(source)
+    return resultat
+
+
+def calculer_derivees(df: pd.DataFrame, noms: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Recalcule les colonnes dérivées demandées dont les sources sont présentes (sans mémoïsation)."""
+    calculables = {nom: derivee.calcul(df) for nom, derivee in COLONNES_DERIVEES.items()
+                   if (noms is None or nom in noms) and all(s in df.columns for s in derivee.sources)}
+    return df.assign(**calculables) if calculables else df
+
+
+class CacheDerivees:
+    """
+    Mémoïsation des colonnes dérivées d'un DataFrame : chaque colonne source a un numéro de version,
+    une colonne dérivée est à jour tant que les versions de ses sources n'ont pas changé.
+    """
+    def __init__(self) -> None:
+        self.versions: Dict[str, int] = defaultdict(int)
+        self._calculees: Dict[str, Tuple[int, ...]] = {}
+
+    def _cle(self, derivee: ColonneDerivee) -> Tuple[int, ...]:
+        return tuple(self.versions[source] for source in derivee.sources)
+
+    def invalider(self, colonnes: Iterable[str]) -> None:
+        for col in colonnes:
+            self.versions[col] += 1
+
+    def reinitialiser(self) -> None:
+        self._calculees.clear()
+
+    def marquer_a_jour(self, df: pd.DataFrame) -> None:
+        # colonnes déjà cohérentes (ex: stockage partagé écrit à partir de données nettoyées)
+        for nom, derivee in COLONNES_DERIVEES.items():
+            if nom in df.columns:
+                self._calculees[nom] = self._cle(derivee)
+
+    def completer(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """
+        Ajoute/met à jour en place les colonnes dérivées périmées de df : df doit appartenir à
+        l'analyseur (les setters de AnalyseurDonnees en gardent une copie superficielle).
+        """
+        if df is None:
+            return df
+        for nom, derivee in COLONNES_DERIVEES.items():
+            cle = self._cle(derivee)
+            if self._calculees.get(nom) == cle and nom in df.columns:
+                continue
+            if all(source in df.columns for source in derivee.sources):
+                df[nom] = derivee.calcul(df)
+                self._calculees[nom] = cle
+        return df
@@ -0,0 +1,110 @@
+"""
+correlations.py
+Matrices de corrélation calculées à partir de statistiques suffisantes fusionnables :
+nombre de lignes, moyennes et co-moments centrés (Xc.T @ Xc, un produit matriciel BLAS par lot).
+Les lots (chunks, partitions, lots de ajouter_patients) se fusionnent sans relire les données,
+globalement et par groupe (ex. par label). Seules les lignes complètes sont utilisées,
+comme `df[colonnes].dropna().corr()`.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+COLONNES_CORRELATION = ['age', 'imc', 'tensionSystolique', 'cholesterol', 'glucose']
+
+
+class StatsCorrelation:
+    def __init__(self, p: int) -> None:
+        self.n = 0
+        self.moyenne = np.zeros(p)
+        self.co_moments = np.zeros((p, p))
+
+    def _ajouter(self, n: int, moyenne: np.ndarray, co_moments: np.ndarray) -> None:
+        # fusion de deux états centrés (Chan et al.) : stable même avec de grandes moyennes
+        total = self.n + n
+        delta = moyenne - self.moyenne
+        self.co_moments += co_moments + np.outer(delta, delta) * (self.n * n / total)
+        self.moyenne += delta * (n / total)
+        self.n = total
+
+    def mettre_a_jour(self, matrice: np.ndarray) -> 'StatsCorrelation':
+        if len(matrice):
+            moyenne = matrice.mean(axis=0)
+            centree = matrice - moyenne
+            self._ajouter(len(matrice), moyenne, centree.T @ centree)
+        return self
+
+    def fusionner(self, autre: 'StatsCorrelation') -> 'StatsCorrelation':
+        if autre.n:
+            self._ajouter(autre.n, autre.moyenne, autre.co_moments)
+        return self
+
+    def covariance(self) -> Optional[np.ndarray]:
+        return self.co_moments / (self.n - 1) if self.n > 1 else None
+
+    def correlation(self) -> Optional[np.ndarray]:
+        if self.n < 2:
+            return None
+        ecarts = np.sqrt(np.diag(self.co_moments))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.clip(self.co_moments / np.outer(ecarts, ecarts), -1, 1)
+
+
+class CorrelationsParGroupe:
+    """Statistiques globales et, si `par` est donné, par valeur de la colonne `par`."""
+    def __init__(self, colonnes: Optional[List[str]] = None, par: Optional[str] = 'label') -> None:
+        self.colonnes = list(COLONNES_CORRELATION if colonnes is None else colonnes)
+        self.par = par
+        self.globales = StatsCorrelation(len(self.colonnes))
+        self.groupes: Dict[Any, StatsCorrelation] = {}
+
+    def mettre_a_jour(self, df: pd.DataFrame) -> 'CorrelationsParGroupe':
+        # ordre Fortran : chaque colonne est remplie de façon contiguë
+        matrice = np.empty((len(df), len(self.colonnes)), order='F')
+        for j, col in enumerate(self.colonnes):
+            matrice[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        completes = ~np.isnan(matrice).any(axis=1)
+        if self.par is None:
+            self.globales.mettre_a_jour(matrice[completes])
+            return self
+
+        # lignes regroupées par un seul tri stable des codes du groupe (-1 = groupe manquant) ;
+        # chaque bloc est traité une fois et les statistiques globales sont la fusion des blocs
+        codes, valeurs = pd.factorize(df[self.par][completes])
+        if len(valeurs) < 2 ** 15:
+            codes = codes.astype(np.int16)   # tri par base, plus rapide sur les petits entiers
+        ordre = np.argsort(codes, kind='stable')
+        bornes = np.searchsorted(codes[ordre], np.arange(-1, len(valeurs) + 1))
+        matrice = matrice.take(np.flatnonzero(completes)[ordre], axis=0)
+        for k, valeur in enumerate([None] + valeurs.tolist()):
+            stats = StatsCorrelation(len(self.colonnes)).mettre_a_jour(matrice[bornes[k]:bornes[k + 1]])
+            if k > 0:
+                self.groupes.setdefault(valeur, StatsCorrelation(len(self.colonnes))).fusionner(stats)
+            self.globales.fusionner(stats)
+        return self
+
+    def fusionner(self, autre: 'CorrelationsParGroupe') -> 'CorrelationsParGroupe':
+        self.globales.fusionner(autre.globales)
+        for valeur, stats in autre.groupes.items():
+            self.groupes.setdefault(valeur, StatsCorrelation(len(self.colonnes))).fusionner(stats)
+        return self
+
+    def correlation(self, groupe=None) -> Optional[np.ndarray]:
+        """Matrice de corrélation globale (groupe=None) ou d'un groupe ; None s'il y a moins de 2 lignes."""
+        if groupe is None:
+            return self.globales.correlation()
+        stats = self.groupes.get(groupe)
+        return None if stats is None else stats.correlation()
+
+    def en_dict(self) -> Dict:
+        def liste(matrice):
+            return None if matrice is None else matrice.tolist()
+        return {
+            'colonnes': self.colonnes,
+            'globale': liste(self.correlation()),
+            **({f'par_{self.par}': {valeur: liste(stats.correlation()) for valeur, stats in sorted(self.groupes.items())}}
+               if self.par is not None else {})
+        }
@@ -1,305 +1,699 @@
+import argparse
+import functools
+import os
+import sys
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Dict, List, Tuple
-import json
-
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cache_colonnes import FORMATS, ecrire_colonnes, format_depuis_chemin, lire_colonnes, lire_csv_avec_cache
+from agregats import CompteurValeurs, EtatImputation, EtatIncremental, EtatRapport, QuantileApprox, StatColonne, TopK
+from imputation import MODES_IMPUTATION, StrategieImputation
+from stockage_partage import StockagePatients
+from moteur_rapport import MoteurRapport
+from analyse_groupes import ResultatGroupes, analyser_groupes
+from parallele import etat_imputation_parallele, rapport_parallele
+from rendu import dessiner_tableau, preparer_panneaux, rendre_en_arriere_plan
+from generation import generer_patients
+from instrumentation import Instrumentation, instrumenter
+from colonnes_derivees import COLONNES_DERIVEES, CacheDerivees, calculer_derivees, sources_necessaires
+from requetes import Egal, MoteurRequetes, predicat_depuis_texte, valeur_depuis_texte
+from cache_rapport import CacheRapports, copie_rapport
+from serialisation import COMPRESSIONS, MODES, ecrire_rapport, morceaux_rapport, ouvrir
+from correlations import COLONNES_CORRELATION, CorrelationsParGroupe
+from partitions import JeuPartitionne
+
+
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    # matplotlib / seaborn ne sont importés (et le style appliqué) qu'au premier graphique :
+    # les traitements sans graphiques ne paient que l'import de pandas et numpy
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.style.use('seaborn-v0_8-darkgrid')
+    sns.set_palette("husl")
+    return plt
 
 class AnalyseurDonnees:
     
-    def __init__(self):
-        self.donnees = None
-        self.donnees_nettoyees = None
-
-    def generer_donnees_exemple(self, n_patients: int = 100) -> pd.DataFrame:
-        np.random.seed(7)
-        
-        data = {
-            'patientId': [f'P{i:04d}' for i in range(1, n_patients + 1)],
-            'age': np.random.randint(20, 80, n_patients),
-            'sexe': np.random.choice(['H', 'F'], n_patients),
-            'poids': np.random.normal(70, 15, n_patients).round(1),
-            'taille': np.random.normal(170, 10, n_patients).round(0),
-            'tensionSystolique': np.random.normal(120, 20, n_patients).round(0),
-            'tensionDiastolique': np.random.normal(80, 10, n_patients).round(0),
-            'cholesterol': np.random.normal(200, 40, n_patients).round(0),
-            'glucose': np.random.normal(100, 25, n_patients).round(0),
-            'label': np.random.choice([1, 2, 3, 4, 5], n_patients,p=[0.3, 0.25, 0.2, 0.15, 0.1])
-        }
-
-        # création du dataframe (et ajout de valeurs manquantes.........)
-        df  = pd.DataFrame(data)
-        for col in df.columns[1:]:
-            # environ 1% de valeurs manquantes par colonne*
-            mask = np.random.rand(n_patients) < 0.01
-            df.loc[mask, col] = np.nan
-
-        # cacul imc et categorie de risque (https://fr.wikipedia.org/wiki/Hypertension_artérielle#Définition)
-        df['imc'] = (df['poids'] / (df['taille'] / 100) ** 2).round(2)
-        df['catRisque'] = pd.cut(
-            df['tensionSystolique'], 
-            bins=[0, 120, 140, 160, 300],
-            labels=['Normal', 'Préhypertension', 'Hypertension stade 1', 'Hypertension stade 2']
-        )
-
+    def __init__(self, verbeux: bool = False, instrumentation: Instrumentation = None):
+        # les messages de progression sont désactivés par défaut (ils coûtent du temps sur les gros fichiers)
+        self.verbeux = verbeux
+        self.instrumentation = instrumentation
+        self._donnees = None
+        self._donnees_nettoyees = None
+        # lots ajoutés par ajouter_patients, concaténés seulement quand on lit le DataFrame
+        self._lots = []
+        self._lots_nettoyes = []
+        self._etat = None
+        # médianes / modes exacts par défaut ; voir imputation.py pour le mode approché et par groupe
+        self.strategie_imputation = StrategieImputation()
+        # colonnes dérivées (imc, catRisque) calculées au premier accès puis mémoïsées
+        self._derivees = CacheDerivees()
+        self._derivees_nettoyees = CacheDerivees()
+        # index des requêtes de cohortes, reconstruits quand les données nettoyées changent
+        self._requetes = None
+        # rapports déjà calculés (et sérialisés) ; _version est incrémentée à chaque modification des données
+        self._version = 0
+        self.cache_rapports = CacheRapports()
+        # statistiques de corrélation par (version, colonne de groupe), partagées entre rapport et graphiques
+        self._correlations: Dict[Tuple, CorrelationsParGroupe] = {}
+        self.stockage = None
+
+    def _afficher(self, *args, **kwargs) -> None:
+        if self.verbeux:
+            print(*args, **kwargs)
+
+    @property
+    def donnees(self) -> pd.DataFrame:
+        if self._lots:
+            self._donnees = pd.concat([self._donnees] + self._lots, ignore_index=True)
+            self._lots = []
+        return self._derivees.completer(self._donnees)
+
+    @donnees.setter
+    def donnees(self, df: pd.DataFrame) -> None:
+        # copie superficielle (sans copier les valeurs) : les colonnes dérivées sont ajoutées
+        # à notre DataFrame, pas à celui de l'appelant
+        self._donnees = None if df is None else df.copy(deep=False)
+        self._lots = []
+        self._etat = None
+        self._correlations = {}
+        self.stockage = None
+        self._version += 1
+        self._derivees.reinitialiser()
+
+    @property
+    def donnees_nettoyees(self) -> pd.DataFrame:
+        if self._lots_nettoyes:
+            self._donnees_nettoyees = pd.concat([self._donnees_nettoyees] + self._lots_nettoyes, ignore_index=True)
+            self._lots_nettoyes = []
+            self._requetes = None
+        return self._derivees_nettoyees.completer(self._donnees_nettoyees)
+
+    @donnees_nettoyees.setter
+    def donnees_nettoyees(self, df: pd.DataFrame) -> None:
+        self._donnees_nettoyees = None if df is None else df.copy(deep=False)
+        self._lots_nettoyes = []
+        self._requetes = None
+        # les indices du stockage partagé ne correspondent plus à ces données
+        self.stockage = None
+        self._derivees_nettoyees.reinitialiser()
+
+    def invalider_colonnes(self, colonnes: List[str]) -> None:
+        # à appeler après une modification en place de colonnes sources (poids, taille...)
+        self._derivees.invalider(colonnes)
+        self._derivees_nettoyees.invalider(colonnes)
+        self._requetes = None
+        # état incrémental, corrélations et stockage partagé décrivent les anciennes valeurs
+        self._etat = None
+        self._correlations = {}
+        self.stockage = None
+        self._version += 1
+
+    @instrumenter()
+    def generer_donnees_exemple(self, n_patients: int = 100, graine: int = 7,
+                                taille_chunk: int = 1_000_000, n_jobs: int = 1) -> pd.DataFrame:
+        # génération vectorisée par chunks (voir generation.py), ~1% de valeurs manquantes par colonne,
+        # avec des types nullables (Int16, Int8, catégories) plutôt qu'une conversion en float
+        chunks = list(generer_patients(n_patients, graine, taille_chunk, n_jobs))
+        df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
+        # imc et catRisque sont ajoutés par la propriété donnees : voir colonnes_derivees.py
         self.donnees = df
-        return df
+        return self.donnees
     
-    def sauvegarder_donness(self, path: str = 'donnees_patients.csv') -> None:
-        if self.donnees is not None:
-            self.donnees.to_csv(path, index=False)
-            print(f'Données sauvegardées dans {path}')
+    @instrumenter()
+    def sauvegarder_donness(self, path: str = 'donnees_patients.csv', nettoyees: bool = False) -> None:
+        donnees = self.donnees_nettoyees if nettoyees else self.donnees
+        if donnees is not None:
+            # .parquet / .feather / .npz : format binaire en colonnes avec schéma compact
+            if format_depuis_chemin(path):
+                ecrire_colonnes(donnees, path, format_depuis_chemin(path))
+            else:
+                donnees.to_csv(path, index=False)
+            self._afficher(f'Données sauvegardées dans {path}')
             return True
         return False
     
-    def charger_donnees(self, path: str = 'donnees_patients.csv') -> pd.DataFrame:
+    @instrumenter()
+    def charger_donnees(self, path: str = 'donnees_patients.csv', colonnes: List[str] = None,
+                        cache: bool = False, filtres: Sequence = ()) -> pd.DataFrame:
+        # filtres : prédicats de requetes.py (Egal, Dans, Intervalle), ex. [Egal('label', 4)]
         try:
-            self.donnees = pd.read_csv(path)
-            print(f'{len(self.donnees)} patients chargé depuis {path}')
+            if os.path.isdir(path):
+                # dossier partitionné (clé=valeur) : seuls les fichiers qui peuvent vérifier les filtres sont lus
+                self.donnees = JeuPartitionne(path).lire(filtres, colonnes)
+            else:
+                # colonnes dérivées demandées : on lit leurs sources, pas les valeurs du fichier
+                lecture = None if colonnes is None else sources_necessaires(list(colonnes) + [p.colonne for p in filtres])
+                if format_depuis_chemin(path):
+                    df = lire_colonnes(path, lecture)
+                elif cache:
+                    df = lire_csv_avec_cache(path, lecture)
+                else:
+                    df = pd.read_csv(path, usecols=lecture)
+                if filtres:
+                    df = calculer_derivees(df, [p.colonne for p in filtres if p.colonne in COLONNES_DERIVEES])
+                    df = df[np.logical_and.reduce([p.masque(df[p.colonne]) for p in filtres])].reset_index(drop=True)
+                self.donnees = df if colonnes is None else calculer_derivees(df, colonnes)[list(colonnes)]
+            # les colonnes dérivées du fichier ne sont pas gardées telles quelles,
+            # elles seront recalculées depuis leurs sources au premier accès
+            self._afficher(f'{len(self._donnees)} patients chargé depuis {path}')
             return self.donnees
         except FileNotFoundError:
-            print(f'{path} non trouvé.')
+            self._afficher(f'{path} non trouvé.')
             return None
         
-    def nettoyer_donnees(self) -> pd.DataFrame:
+    @instrumenter()
+    def ajouter_patients(self, lot) -> pd.DataFrame:
+        lot = pd.DataFrame(lot)
+        lot = calculer_derivees(lot)
+        if self._donnees is None:
+            self.donnees = lot.reset_index(drop=True)
+        else:
+            if self._etat is None:
+                # premier ajout : on construit l'état une fois sur les données existantes
+                self._etat = self._etat_incremental().mettre_a_jour(self.donnees)
+            # les colonnes dérivées restent dans le lot pour l'état, pas dans les lots stockés
+            self._lots.append(lot.reindex(columns=self._donnees.columns))
+        if self._etat is None:
+            self._etat = self._etat_incremental()
+        self._etat.mettre_a_jour(lot)
+        # les corrélations déjà calculées sont mises à jour avec le lot seul (statistiques fusionnables)
+        correlations = {par: c.mettre_a_jour(lot) for (version, par), c in self._correlations.items()
+                        if version == self._version}
+        self._version += 1
+        self._correlations = {(self._version, par): c for par, c in correlations.items()}
+        self.stockage = None
+
+        # les nouvelles lignes sont nettoyées avec les médianes/modes courants
+        if self._donnees_nettoyees is not None:
+            lot_nettoye = lot.drop(columns=[c for c in COLONNES_DERIVEES if c in lot.columns])
+            lot_nettoye = self.strategie_imputation.appliquer(lot_nettoye, self._etat.imputation)
+            self._lots_nettoyes.append(calculer_derivees(lot_nettoye))
+        return lot
+
+    def _etat_incremental(self) -> EtatIncremental:
+        return EtatIncremental(imputation=self.strategie_imputation.etat(colonnes_ignorees=('patientId',)))
+
+    @instrumenter()
+    def nettoyer_donnees(self, n_jobs: int = 1, strategie: StrategieImputation = None) -> pd.DataFrame:
         if self.donnees is None:
             raise ValueError("Aucune donnée à nettoyer")
+        if strategie is not None:
+            self.strategie_imputation = strategie
+        strategie = self.strategie_imputation
 
-        df_nettoye = self.donnees.copy()
+        # les colonnes dérivées ne sont pas imputées : elles seront recalculées
+        # à partir des sources nettoyées au premier accès à donnees_nettoyees
+        df_nettoye = self.donnees.drop(columns=[c for c in COLONNES_DERIVEES if c in self.donnees.columns])
 
         valeurs_manquantes = df_nettoye.isnull().sum()
-        print("Valeurs manquantes par colonne avant nettoyage :")
+        self._afficher("Valeurs manquantes par colonne avant nettoyage :")
         for col, count in valeurs_manquantes[valeurs_manquantes > 0].items():
-            print(f"\t{col}: {count} valeurs")
+            self._afficher(f"\t{col}: {count} valeurs")
 
-        colonnes_num = df_nettoye.select_dtypes(include=[np.number]).columns
-        for col in colonnes_num:
-            mediane = df_nettoye[col].median()
-            df_nettoye[col] = df_nettoye[col].fillna(mediane)
-            print(f"Valeurs manquantes dans '{col}' remplacées par la médiane: {mediane}")
+        # seules les colonnes incomplètes ont besoin d'une médiane / d'un mode
+        colonnes_num = [col for col in df_nettoye.select_dtypes(include=[np.number]).columns if valeurs_manquantes[col] > 0]
+        # 'string' explicite : pandas 3 range les textes dans le dtype str (et non plus object)
+        colonnes_cat = [col for col in df_nettoye.select_dtypes(include=['object', 'string', 'category']).columns if valeurs_manquantes[col] > 0]
+        if n_jobs != 1:
+            # états partiels calculés par tranches dans un pool de processus puis fusionnés
+            etat = etat_imputation_parallele(df_nettoye, strategie, colonnes_num, colonnes_cat, n_jobs)
+        else:
+            etat = strategie.etat(colonnes_num, colonnes_cat).mettre_a_jour(df_nettoye)
 
-        colonnes_cat = df_nettoye.select_dtypes(include=['object']).columns
-        for col in colonnes_cat:
-            mode = df_nettoye[col].mode()[0]
-            df_nettoye[col] = df_nettoye[col].fillna(mode)
-            print(f"Valeurs manquantes dans '{col}' remplacées par le mode: {mode}")
+        df_nettoye = strategie.appliquer(df_nettoye, etat)
+        self._afficher_imputation(etat, strategie)
 
         self.donnees_nettoyees = df_nettoye
-        print("Nettoyage des données terminé")
-        return df_nettoye
+        self._afficher("Nettoyage des données terminé")
+        return self.donnees_nettoyees
+
+    def _afficher_imputation(self, etat: EtatImputation, strategie: StrategieImputation) -> None:
+        if not self.verbeux:
+            return
+        valeurs = etat.valeurs()
+        approchee = '' if strategie.mode == 'exact' else ' approchée'
+        for col in etat.colonnes_num + etat.colonnes_cat:
+            if etat.nuls[col] == 0:
+                continue
+            nature = f"la médiane{approchee}" if col in etat.colonnes_num else "le mode"
+            if strategie.par is not None and col != strategie.par:
+                self._afficher(f"Valeurs manquantes dans '{col}' remplacées par {nature} par {strategie.par} "
+                               f"(globale : {valeurs[col]})")
+            else:
+                self._afficher(f"Valeurs manquantes dans '{col}' remplacées par {nature}: {valeurs[col]}")
     
+    @instrumenter()
     def analyser_patients(self, col: str, val: any) -> pd.DataFrame:
         if self.donnees_nettoyees is None:
             raise ValueError("Les données doivent être nettoyées avant l'analyse")
 
-        patients_filtres = self.donnees_nettoyees[self.donnees_nettoyees[col] == val].copy()
+        # une seule extraction des lignes du groupe (iloc) au lieu de masque + copy()
+        indices = self.indices_patients(col, val)
+        patients_filtres = self.donnees_nettoyees.iloc[indices]
         
-        print(f"\nAnalyse des patients avec {col} = {val}")
-        print("-"*30)
-        print(f"Nombre de patients :\t{len(patients_filtres)}")
-        print(f"Pourcentage du total :\t{(len(patients_filtres) / len(self.donnees_nettoyees) * 100):.1f}%")
+        self._afficher(f"\nAnalyse des patients avec {col} = {val}")
+        self._afficher("-"*30)
+        self._afficher(f"Nombre de patients :\t{len(patients_filtres)}")
+        self._afficher(f"Pourcentage du total :\t{(len(patients_filtres) / len(self.donnees_nettoyees) * 100):.1f}%")
 
-        if len(patients_filtres) > 0:
+        # le bloc suivant ne sert qu'à l'affichage : on ne calcule pas describe() etc. en mode silencieux
+        if self.verbeux and len(patients_filtres) > 0:
             # stats descriptives
-            print(f"\nStatistiques des patients '{col}={val}' :")
+            self._afficher(f"\nStatistiques des patients '{col}={val}' :")
             stats_cols = ['age', 'poids', 'taille', 'imc',
                           'tensionSystolique', 'tensionDiastolique', 
                           'cholesterol', 'glucose']
             stats_resume = patients_filtres[stats_cols].describe()
-            print(stats_resume.round(2))
+            self._afficher(stats_resume.round(2))
 
             #  comparaison pop générale
-            print(f"\nComparaison avec la population générale :")
+            self._afficher(f"\nComparaison avec la population générale :")
             for col in ['age', 'imc', 'tensionSystolique']:
                 moyenne_grp = patients_filtres[col].mean()
                 moyenne_pop = self.donnees_nettoyees[col].mean()
                 diff = ((moyenne_grp - moyenne_pop) / moyenne_pop) * 100
-                print(f"\t{col}:\n\t   - Moyenne groupe = {moyenne_grp:.2f},\n\t   - Moyenne pop = {moyenne_pop:.2f},\n\t   - Diff = {diff:+.2f}%")
+                self._afficher(f"\t{col}:\n\t   - Moyenne groupe = {moyenne_grp:.2f},\n\t   - Moyenne pop = {moyenne_pop:.2f},\n\t   - Diff = {diff:+.2f}%")
 
             # distribution par sexe 
-            print(f"\nDistribution par sexe :")
+            self._afficher(f"\nDistribution par sexe :")
             dist_sexe = patients_filtres['sexe'].value_counts()
             for sexe, count in dist_sexe.items():
                 pourcentage = (count / len(patients_filtres)) * 100
-                print(f"\t{sexe}: {count} patients ({pourcentage:.1f}%)")
+                self._afficher(f"\t{sexe}: {count} patients ({pourcentage:.1f}%)")
 
             # patients avec le plus haut imc
-            top_imc = patients_filtres.nlargest(5, 'imc')[['patientId', 'imc']]
-            print(f"\nTop 5 patients avec le plus haut IMC :")
-            print(top_imc.to_string(index=False))
+            if 'patientId' in patients_filtres.columns or self.stockage is None:
+                top_imc = patients_filtres.nlargest(5, 'imc')[[c for c in ('patientId', 'imc') if c in patients_filtres.columns]]
+            else:
+                # données du stockage partagé (index = position) : identifiants lus à la demande
+                top = patients_filtres['imc'].nlargest(5)
+                top_imc = pd.DataFrame({'patientId': self.stockage.identifiants(top.index.to_numpy()),
+                                        'imc': top.to_numpy()})
+            self._afficher(f"\nTop 5 patients avec le plus haut IMC :")
+            self._afficher(top_imc.to_string(index=False))
 
         return patients_filtres
 
+    @instrumenter()
+    def analyser_groupes(self, col: str, k: int = 5, afficher: bool = False) -> ResultatGroupes:
+        if self.donnees_nettoyees is None:
+            raise ValueError("Les données doivent être nettoyées avant l'analyse")
+
+        ids = None
+        if 'patientId' not in self.donnees_nettoyees.columns and self.stockage is not None:
+            ids = np.asarray(self.stockage.identifiants())
+        resultat = analyser_groupes(self.donnees_nettoyees, col, k, ids)
+        if afficher:
+            resultat.afficher()
+        return resultat
 
-    def display_donnees(self, show_plot: bool = True) -> None:
+    def indices_patients(self, col: str, val: any) -> np.ndarray:
+        if self.donnees_nettoyees is None:
+            raise ValueError("Les données doivent être nettoyées avant l'analyse")
+        if self.stockage is not None and col in self.stockage.colonnes:
+            return self.stockage.indices(col, val)
+        if self._requetes is not None:
+            # index déjà construits par requete() : pas de parcours complet de la colonne
+            return self._requetes.executer(Egal(col, val))
+        return np.flatnonzero((self.donnees_nettoyees[col] == val).to_numpy())
+
+    @property
+    def moteur_requetes(self) -> MoteurRequetes:
+        if self.donnees_nettoyees is None:
+            raise ValueError("Les données doivent être nettoyées avant l'analyse")
+        if self._requetes is None:
+            self._requetes = MoteurRequetes(self.donnees_nettoyees)
+        return self._requetes
+
+    @instrumenter()
+    def requete(self, *predicats, colonnes: Optional[List[str]] = None) -> pd.DataFrame:
+        # ex. requete(Egal('label', 4), Intervalle('age', 60, inclure_bas=False), Egal('sexe', 'F'))
+        return self.moteur_requetes.selection(*predicats, colonnes=colonnes)
+
+    # stockage partagé : les colonnes numériques nettoyées sont écrites une fois en .npy
+    # puis chaque processus les mappe en lecture seule au lieu de recharger le CSV
+    def creer_stockage(self, dossier: str = 'stockage_patients') -> StockagePatients:
+        df = self.donnees_nettoyees if self.donnees_nettoyees is not None else self.donnees
+        if df is None:
+            raise ValueError("Aucune donnée à stocker")
+        self.stockage = StockagePatients.creer(df, dossier)
+        self._afficher(f"Stockage partagé créé dans '{dossier}'")
+        return self.stockage
+
+    def ouvrir_stockage(self, dossier: str = 'stockage_patients') -> pd.DataFrame:
+        stockage = StockagePatients(dossier)
+        self.donnees_nettoyees = stockage.vers_dataframe()
+        self.stockage = stockage
+        self._derivees_nettoyees.marquer_a_jour(self._donnees_nettoyees)
+        self._afficher(f'{len(self.stockage)} patients mappés depuis {dossier}')
+        return self.donnees_nettoyees
+
+    @instrumenter()
+    def display_donnees(self, show_plot: bool = True, asynchrone: bool = False,
+                        filename: str = 'analyse_patients.png', dpi: int = 300):
         if self.donnees is None:
             self.generer_donnees_exemple()
 
-        fig, axes = plt.subplots(2, 3, figsize=(15, 10))
-        fig.suptitle('Analyse des données de patients', fontsize=16, fontweight='bold')
-        
-        # distrib labels
-        ax1 = axes[0, 0]
-        label_counts = self.donnees['label'].value_counts().sort_index()
-        colors = ['#FF6B6B', "#CD4EAF", "#45D147", '#FFA07A', "#7DE3CD"]
-        bars = ax1.bar(label_counts.index, label_counts.values, color=colors)
-        ax1.set_xlabel('Label')
-        ax1.set_ylabel('Nombre patients')
-        ax1.set_title('Distribution labels')
-        ax1.set_xticks(label_counts.index)
-        bars[3].set_edgecolor('red') # highlight label 4
-        bars[3].set_linewidth(3)
-        for bar in bars:
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height)}', ha='center', va='bottom')
-            
-        # distrib age par label
-        ax2 = axes[0, 1]
-        for label in sorted(self.donnees['label'].unique()):
-            ages = self.donnees[self.donnees['label'] == label]['age']
-            ax2.hist(ages, alpha=0.5, label=f'Label {label}', bins=15)
-        ax2.set_xlabel('age')
-        ax2.set_ylabel('Frequence')
-        ax2.set_title('Distribution age par label')
-        ax2.legend()
-
-        # imc vs tension pour les patients du label 4
-        ax3 = axes[0, 2]
-        label_4 = self.donnees[self.donnees['label'] == 4]
-        autres = self.donnees[self.donnees['label'] != 4]
-        ax3.scatter(autres['imc'], autres['tensionSystolique'], 
-                   alpha=0.3, label='Autres labels', s=30)
-        ax3.scatter(label_4['imc'], label_4['tensionSystolique'], 
-                   color='red', alpha=0.8, label='Label 4', s=50, edgecolors='darkred')
-        ax3.set_xlabel('IMC')
-        ax3.set_ylabel('Tension systolique')
-        ax3.set_title('IMC vs tension (label4 en rouge)')
-        ax3.legend()
-        ax3.grid(True, alpha=0.3)
-
-        # boxplot des variables par label
-        ax4 = axes[1, 0]
-        data_for_box = []
-        labels_for_box = []
-        for label in sorted(self.donnees['label'].unique()):
-            data_for_box.append(self.donnees[self.donnees['label'] == label]['cholesterol'].dropna())
-            labels_for_box.append(f'L{label}')
-        bp = ax4.boxplot(data_for_box, tick_labels=labels_for_box, patch_artist=True)
-        for i, box in enumerate(bp['boxes']):
-            if i == 3:  # label 4
-                box.set_facecolor('red')
-                box.set_alpha(0.7)
-            else:
-                box.set_facecolor('lightblue')
-        ax4.set_xlabel('Label')
-        ax4.set_ylabel('cholestérol')
-        ax4.set_title('distribution du cholesterol par label')
-
-        # matrice de corrélation pour label4
-        ax5 = axes[1, 1]
-        label_4_data = self.donnees[self.donnees['label'] == 4][
-            ['age', 'imc', 'tensionSystolique', 'cholesterol', 'glucose']
-        ].dropna()
-        if len(label_4_data) > 0:
-            corr = label_4_data.corr()
-            im = ax5.imshow(corr, cmap='coolwarm', aspect='auto', vmin=-1, vmax=1)
-            ax5.set_xticks(range(len(corr.columns)))
-            ax5.set_yticks(range(len(corr.columns)))
-            ax5.set_xticklabels(corr.columns, rotation=45, ha='right')
-            ax5.set_yticklabels(corr.columns)
-            ax5.set_title('Corrélations - patients label 4')
-            for i in range(len(corr.columns)): 
-                for j in range(len(corr.columns)):
-                    text = ax5.text(j, i, f"{corr.iloc[i, j]:.2f}",
-                                   ha="center", va="center", color="w" if abs(corr.iloc[i, j]) > 0.5 else "black", fontsize=8)
-            
-        # repartition par sexe et catégorie de risque
-        ax6 = axes[1, 2]
-        risk_by_sex = pd.crosstab(self.donnees['sexe'], self.donnees['catRisque'])
-        risk_by_sex.plot(kind='bar', stacked=True, ax=ax6, colormap='RdYlBu_r')
-        ax6.set_xlabel('Sexe')
-        ax6.set_ylabel('Nombre patients')
-        ax6.set_title('Répartition de risque par sexe')
-        ax6.set_xticklabels(['Femme', 'Homme'], rotation=0)
-        ax6.legend(title='Catégorie', bbox_to_anchor=(1.05, 1), loc='upper left')
-
-        plt.tight_layout()
-        filename = 'analyse_patients.png'
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
-        print(f"graphiques sauvegardés dans '{filename}'")
+        options = {'correlation': {'correlations': self.correlations()}}
+        # les panneaux sont dessinés à partir d'agrégats (histogrammes, histogramme 2D au-delà
+        # de SEUIL_POINTS patients, stats de boîtes) : le temps de dessin ne dépend pas du nombre de lignes
+        if asynchrone:
+            # rendu dans un thread de fond, on récupère un Future (show_plot est ignoré :
+            # une fenêtre ne peut pas être ouverte hors du thread principal) ;
+            # l'import de matplotlib et le style sont faits dans ce thread aussi
+            return rendre_en_arriere_plan(self.donnees, filename, dpi, options, preparation=_pyplot)
+
+        plt = _pyplot()
+        fig = plt.figure(figsize=(15, 10))
+        dessiner_tableau(preparer_panneaux(self.donnees, options=options), fig)
+        plt.savefig(filename, dpi=dpi, bbox_inches='tight')
+        self._afficher(f"graphiques sauvegardés dans '{filename}'")
         if show_plot:
             plt.show() 
 
-    def generer_rapport(self) -> Dict: 
-        if self.donnees is None:
+    def correlations(self, par: str = 'label') -> CorrelationsParGroupe:
+        # une passe (produits matriciels) par version des données, puis réutilisé par le rapport et les graphiques
+        if self._donnees is None and not self._lots:
+            self.generer_donnees_exemple()
+        cle = (self._version, par)
+        if cle not in self._correlations:
+            self._correlations = {c: v for c, v in self._correlations.items() if c[0] == self._version}
+            self._correlations[cle] = CorrelationsParGroupe(COLONNES_CORRELATION, par).mettre_a_jour(self.donnees)
+        return self._correlations[cle]
+
+    @instrumenter()
+    def generer_rapport(self, groupes: Dict[str, Tuple[str, any]] = None, n_jobs: int = 1,
+                        correlations: bool = False) -> Dict: 
+        # copie : le rapport gardé en cache ne sert qu'à export_rapport / rapport_json
+        return copie_rapport(self._entree_rapport(groupes, n_jobs, correlations).rapport)
+
+    def _entree_rapport(self, groupes: Dict[str, Tuple[str, any]] = None, n_jobs: int = 1,
+                        correlations: bool = False):
+        # _donnees / _lots plutôt que donnees : la propriété concatène les lots en attente (O(N))
+        if self._donnees is None and not self._lots:
             self.generer_donnees_exemple()
 
-        rapport = {
-            'resume_general': {
-                'nombre_total_patients': len(self.donnees),
-                'age_moyen': self.donnees['age'].mean(),
-                'age_min': self.donnees['age'].min(),
-                'age_max': self.donnees['age'].max(),
-                'ratio_hommes_femmes': f"{(self.donnees['sexe']=='M').sum()}:{(self.donnees['sexe']=='F').sum()}",
-                'imc_moyen': self.donnees['imc'].mean()
-            },
-            'distribution_labels': self.donnees['label'].value_counts().to_dict(),
-            'patients_label_4': {
-                'nombre': len(self.donnees[self.donnees['label'] == 4]),
-                'pourcentage': len(self.donnees[self.donnees['label'] == 4]) / len(self.donnees) * 100,
-                'age_moyen': self.donnees[self.donnees['label'] == 4]['age'].mean() if len(self.donnees[self.donnees['label'] == 4]) > 0 else 0,
-                'liste_ids': self.donnees[self.donnees['label'] == 4]['patientId'].tolist()
-            },
-            'statistiques_sante': {
-                'tension_moyenne': f"{self.donnees['tensionSystolique'].mean():.0f}/{self.donnees['tensionDiastolique'].mean():.0f}",
-                'cholesterol_moyen': self.donnees['cholesterol'].mean(),
-                'glucose_moyen': self.donnees['glucose'].mean(),
-                'patients_hypertendus': len(self.donnees[self.donnees['tensionSystolique'] > 140])
-            }
-        }
-
-        return rapport
+        if self._rapport_incremental(groupes):
+            cle = self.cache_rapports.cle_version(self._version, groupes, correlations)
+        else:
+            cle = self.cache_rapports.cle(self.donnees, self._version, groupes, correlations)
+        entree = self.cache_rapports.obtenir(cle)
+        if entree is None:
+            rapport = self._calculer_rapport(groupes, n_jobs)
+            if correlations:
+                rapport = {**rapport, 'correlations': self.correlations().en_dict()}
+            entree = self.cache_rapports.ajouter(cle, rapport)
+        return entree
+
+    def _rapport_incremental(self, groupes: Dict[str, Tuple[str, any]] = None) -> bool:
+        # données alimentées par ajouter_patients : le rapport vient de l'état maintenu
+        return self._etat is not None and groupes in (None, self._etat.rapport.groupes)
+
+    def _calculer_rapport(self, groupes: Dict[str, Tuple[str, any]] = None, n_jobs: int = 1) -> Dict:
+        if self._rapport_incremental(groupes):
+            # vues en lecture seule : copiées en listes seulement dans ce que renvoie generer_rapport
+            return self._etat.rapport.rapport(vues=True)
+
+        # groupes : {nom de la section: (colonne, valeur)}, par défaut {'patients_label_4': ('label', 4)}
+        if n_jobs != 1:
+            return rapport_parallele(self.donnees, groupes, n_jobs)
+        return MoteurRapport(groupes).calculer(self.donnees)
+
+    def rapport_json(self, groupes: Dict[str, Tuple[str, any]] = None, mode: str = 'indent',
+                     correlations: bool = False) -> bytes:
+        # JSON sérialisé une seule fois par version des données, puis relu depuis le cache
+        entree = self._entree_rapport(groupes, correlations=correlations)
+        if mode not in entree.json:
+            entree.json[mode] = b''.join(morceaux_rapport(entree.rapport, mode))
+            self.cache_rapports.limiter()
+        return entree.json[mode]
     
-    def export_rapport(self, path: str = 'rapport_analyse.json') -> None:
-        rapport = self.generer_rapport()
-
-        def convert_numpy(obj): # conversion types numpu en types python
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {k: convert_numpy(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_numpy(item) for item in obj]
-            return obj
+    @instrumenter()
+    def export_rapport(self, path: str = 'rapport_analyse.json', mode: str = 'indent',
+                       compression: str = None, correlations: bool = False) -> Dict:
+        # mode : 'indent' (comme json.dump(indent=2)), 'compact' ou 'ndjson' ;
+        # compression : 'gzip', 'bz2', 'xz' ou déduite de l'extension (.gz, .bz2, .xz)
+        entree = self._entree_rapport(correlations=correlations)
+        octets = entree.json.get(mode)
+        # les gros rapports sont écrits bloc par bloc sans être gardés en mémoire ni dans le cache
+        garder = octets is None and entree.taille <= self.cache_rapports.max_octets // 4
+        morceaux = []
+        with ouvrir(path, 'wb', compression) as f:
+            for morceau in ([octets] if octets is not None else morceaux_rapport(entree.rapport, mode)):
+                f.write(morceau)
+                if garder:
+                    morceaux.append(morceau)
+        if garder:
+            entree.json[mode] = b''.join(morceaux)
+            self.cache_rapports.limiter()
         
-        rapport_clean = convert_numpy(rapport)
+        self._afficher(f"Rapport sauvegardé dans '{path}'")
+        return copie_rapport(entree.rapport)
+
+    # mode flux : le CSV est lu par chunks et on ne garde que des agrégats fusionnables,
+    # la mémoire dépend de taille_chunk et pas de la taille du fichier
+    def _lire_chunks(self, path: str, taille_chunk: int, colonnes: List[str] = None, derivees: bool = True):
+        # les colonnes dérivées sont recalculées sur chaque chunk à partir de leurs sources
+        lecture = None if colonnes is None else sources_necessaires(colonnes)
+        for chunk in pd.read_csv(path, chunksize=taille_chunk, usecols=lecture):
+            chunk = chunk.drop(columns=[c for c in COLONNES_DERIVEES if c in chunk.columns])
+            yield calculer_derivees(chunk, colonnes) if derivees else chunk
+
+    def etat_imputation_flux(self, path: str = 'donnees_patients.csv', taille_chunk: int = 100_000,
+                             strategie: StrategieImputation = None) -> EtatImputation:
+        # passe 1 : médianes et modes fusionnés chunk par chunk ; par défaut en mode approché
+        # (sketchs de taille bornée), donc la mémoire ne dépend pas de la taille du fichier
+        strategie = strategie or StrategieImputation('approx')
+        etat = strategie.etat(colonnes_ignorees=('patientId',))
+        n = 0
+        for chunk in self._lire_chunks(path, taille_chunk, derivees=False):
+            etat.mettre_a_jour(chunk)
+            n += len(chunk)
+        if n == 0:
+            raise ValueError("Aucune donnée à nettoyer")
 
-        with open(path, 'w') as f:
-            json.dump(rapport_clean, f, ensure_ascii=False, indent=2)
-        
-        print(f"Rapport sauvegardé dans '{path}'")
-        return rapport_clean    
+        self._afficher("Valeurs manquantes par colonne avant nettoyage :")
+        for col, count in etat.nuls.items():
+            if count > 0:
+                self._afficher(f"\t{col}: {count} valeurs")
+        self._afficher_imputation(etat, strategie)
+        return etat
+
+    def valeurs_imputation_flux(self, path: str = 'donnees_patients.csv', taille_chunk: int = 100_000,
+                                strategie: StrategieImputation = None) -> Dict:
+        return self.etat_imputation_flux(path, taille_chunk, strategie).valeurs()
+
+    @instrumenter()
+    def nettoyer_flux(self, path: str = 'donnees_patients.csv', sortie: str = 'donnees_nettoyees.csv',
+                      taille_chunk: int = 100_000, strategie: StrategieImputation = None) -> Dict:
+        strategie = strategie or StrategieImputation('approx')
+        etat = self.etat_imputation_flux(path, taille_chunk, strategie)
+        # passe 2 : chaque chunk est imputé puis écrit
+        for i, chunk in enumerate(self._lire_chunks(path, taille_chunk, derivees=False)):
+            chunk = calculer_derivees(strategie.appliquer(chunk, etat))
+            chunk.to_csv(sortie, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        self._afficher(f"Nettoyage des données terminé, résultat dans '{sortie}'")
+        return etat.valeurs()
+
+    @instrumenter()
+    def analyser_patients_flux(self, path: str, col: str, val: any, taille_chunk: int = 100_000) -> Dict:
+        stats_cols = ['age', 'poids', 'taille', 'imc',
+                      'tensionSystolique', 'tensionDiastolique',
+                      'cholesterol', 'glucose']
+        comparaison_cols = ['age', 'imc', 'tensionSystolique']
+        n_total = 0
+        n_groupe = 0
+        stats_grp = {c: StatColonne() for c in stats_cols}
+        quantiles_grp = {c: QuantileApprox(k=1000) for c in stats_cols}
+        stats_pop = {c: StatColonne() for c in comparaison_cols}
+        sexes = CompteurValeurs()
+        top_imc = TopK(5, 'imc', ['patientId'])
+
+        for chunk in self._lire_chunks(path, taille_chunk):
+            n_total += len(chunk)
+            for c in comparaison_cols:
+                stats_pop[c].mettre_a_jour(chunk[c])
+            groupe = chunk[chunk[col] == val]
+            n_groupe += len(groupe)
+            for c in stats_cols:
+                stats_grp[c].mettre_a_jour(groupe[c])
+                quantiles_grp[c].mettre_a_jour(groupe[c])
+            sexes.mettre_a_jour(groupe['sexe'])
+            top_imc.mettre_a_jour(groupe)
+
+        self._afficher(f"\nAnalyse des patients avec {col} = {val}")
+        self._afficher("-"*30)
+        self._afficher(f"Nombre de patients :\t{n_groupe}")
+        self._afficher(f"Pourcentage du total :\t{(n_groupe / n_total * 100):.1f}%")
+
+        stats_resume = pd.DataFrame({
+            c: {'count': s.n, 'mean': s.moyenne, 'std': s.ecart_type, 'min': s.min,
+                '25%': quantiles_grp[c].quantile(0.25), '50%': quantiles_grp[c].quantile(0.5),
+                '75%': quantiles_grp[c].quantile(0.75), 'max': s.max}
+            for c, s in stats_grp.items()
+        })
+        comparaison = {}
+        if n_groupe > 0:
+            self._afficher(f"\nStatistiques des patients '{col}={val}' :")
+            self._afficher(stats_resume.round(2))
+
+            self._afficher(f"\nComparaison avec la population générale :")
+            for c in comparaison_cols:
+                moyenne_grp = stats_grp[c].moyenne
+                moyenne_pop = stats_pop[c].moyenne
+                diff = ((moyenne_grp - moyenne_pop) / moyenne_pop) * 100
+                comparaison[c] = {'moyenne_groupe': moyenne_grp, 'moyenne_pop': moyenne_pop, 'diff': diff}
+                self._afficher(f"\t{c}:\n\t   - Moyenne groupe = {moyenne_grp:.2f},\n\t   - Moyenne pop = {moyenne_pop:.2f},\n\t   - Diff = {diff:+.2f}%")
+
+            self._afficher(f"\nDistribution par sexe :")
+            for sexe, count in sexes.en_dict().items():
+                pourcentage = (count / n_groupe) * 100
+                self._afficher(f"\t{sexe}: {count} patients ({pourcentage:.1f}%)")
+
+            self._afficher(f"\nTop 5 patients avec le plus haut IMC :")
+            self._afficher(top_imc.meilleurs.to_string(index=False))
+
+        return {
+            'nombre': n_groupe,
+            'pourcentage': n_groupe / n_total * 100 if n_total > 0 else 0,
+            'statistiques': stats_resume,
+            'comparaison': comparaison,
+            'distribution_sexe': sexes.en_dict(),
+            'top_imc': top_imc.meilleurs
+        }
+
+    @instrumenter()
+    def generer_rapport_flux(self, path: str = 'donnees_patients.csv', taille_chunk: int = 100_000,
+                             groupes: Dict[str, Tuple[str, any]] = None) -> Dict:
+        etat = EtatRapport(groupes)
+        colonnes = list(dict.fromkeys(['patientId', 'sexe', 'label'] + EtatRapport.colonnes_moyennes
+                                      + [col for col, _ in etat.groupes.values()]))
+        for chunk in self._lire_chunks(path, taille_chunk, colonnes):
+            etat.mettre_a_jour(chunk)
+        return etat.rapport()
+
+    @instrumenter()
+    def generer_rapport_partitions(self, dossier: str, filtres: Sequence = (),
+                                   groupes: Dict[str, Tuple[str, any]] = None) -> Dict:
+        jeu = JeuPartitionne(dossier)
+        # filtres et groupes sur les clés de partition : rapport tiré des métadonnées
+        etat = jeu.etat_rapport(filtres, groupes)
+        if etat is not None:
+            return etat.rapport()
+        # sinon : seuls les fichiers retenus et les colonnes du rapport sont lus
+        etat = EtatRapport(groupes)
+        colonnes = list(dict.fromkeys(['patientId', 'sexe', 'label'] + EtatRapport.colonnes_moyennes
+                                      + [col for col, _ in etat.groupes.values()]))
+        return etat.mettre_a_jour(jeu.lire(filtres, colonnes)).rapport()
+
+    def correlations_flux(self, path: str = 'donnees_patients.csv', taille_chunk: int = 100_000,
+                          par: str = 'label') -> CorrelationsParGroupe:
+        correlations = CorrelationsParGroupe(COLONNES_CORRELATION, par)
+        for chunk in self._lire_chunks(path, taille_chunk, COLONNES_CORRELATION + ([par] if par else [])):
+            correlations.mettre_a_jour(chunk)
+        return correlations
     
-def main():
+def _filtres(args) -> list:
+    # --filtre label=4 --filtre age=60.. --filtre sexe=F,M
+    return [predicat_depuis_texte(*filtre.split('=', 1)) for filtre in args.filtre]
+
+
+def _charger(analyseur: AnalyseurDonnees, args) -> pd.DataFrame:
+    return analyseur.charger_donnees(args.entree, cache=args.cache, filtres=_filtres(args))
+
+
+def _commande_generer(analyseur: AnalyseurDonnees, args) -> None:
+    analyseur.generer_donnees_exemple(args.patients, args.graine, n_jobs=args.n_jobs)
+    if args.partitionner:
+        JeuPartitionne.ecrire(analyseur.donnees, args.sortie, args.partitionner, args.format)
+        analyseur._afficher(f"Données sauvegardées dans {args.sortie} (partitions : {', '.join(args.partitionner)})")
+    else:
+        analyseur.sauvegarder_donness(args.sortie)
+
+
+def _commande_nettoyer(analyseur: AnalyseurDonnees, args) -> None:
+    strategie = StrategieImputation(args.imputation or ('approx' if args.flux else 'exact'), par=args.par)
+    if args.flux:
+        analyseur.nettoyer_flux(args.entree, args.sortie, args.taille_chunk, strategie)
+        return
+    _charger(analyseur, args)
+    analyseur.nettoyer_donnees(args.n_jobs, strategie)
+    analyseur.sauvegarder_donness(args.sortie, nettoyees=True)
+
+
+def _commande_analyser(analyseur: AnalyseurDonnees, args) -> None:
+    valeur = valeur_depuis_texte(args.valeur)
+    if args.flux:
+        nombre = analyseur.analyser_patients_flux(args.entree, args.colonne, valeur, args.taille_chunk)['nombre']
+    else:
+        _charger(analyseur, args)
+        analyseur.nettoyer_donnees(args.n_jobs)
+        patients = analyseur.analyser_patients(args.colonne, valeur)
+        nombre = len(patients)
+    # en mode silencieux, seul le résultat est affiché
+    if args.silencieux:
+        print(f"{nombre} patients avec {args.colonne} = {valeur}")
+    if args.sortie and not args.flux:
+        patients.to_csv(args.sortie, index=False)
+
+
+def _commande_rapport(analyseur: AnalyseurDonnees, args) -> None:
+    if args.flux:
+        rapport = analyseur.generer_rapport_flux(args.entree, args.taille_chunk)
+        ecrire_rapport(rapport, args.sortie, args.mode, args.compression)
+        analyseur._afficher(f"Rapport sauvegardé dans '{args.sortie}'")
+        return
+    if os.path.isdir(args.entree):
+        rapport = analyseur.generer_rapport_partitions(args.entree, _filtres(args))
+        ecrire_rapport(rapport, args.sortie, args.mode, args.compression)
+        analyseur._afficher(f"Rapport sauvegardé dans '{args.sortie}'")
+        return
+    _charger(analyseur, args)
+    # rapport calculé (éventuellement en parallèle) puis écrit depuis le cache
+    analyseur.generer_rapport(n_jobs=args.n_jobs, correlations=args.correlations)
+    analyseur.export_rapport(args.sortie, args.mode, args.compression, args.correlations)
+
+
+def _commande_graphique(analyseur: AnalyseurDonnees, args) -> None:
+    _charger(analyseur, args)
+    analyseur.display_donnees(show_plot=args.afficher, filename=args.sortie, dpi=args.dpi)
+
+
+def _commande_servir(analyseur: AnalyseurDonnees, args) -> None:
+    # asyncio et le service ne sont importés que pour cette commande
+    import asyncio
+    from service import ServiceAnalyse
+
+    def charger(path: str) -> AnalyseurDonnees:
+        # un nouvel analyseur par chargement : celui en service reste utilisable pendant ce temps
+        nouveau = AnalyseurDonnees(instrumentation=analyseur.instrumentation)
+        if nouveau.charger_donnees(path, cache=args.cache) is None or len(nouveau.donnees) == 0:
+            # fichier absent ou en cours d'écriture : le service garde les données actuelles
+            raise ValueError(f"Aucune donnée dans {path}")
+        nouveau.nettoyer_donnees(args.n_jobs, StrategieImputation(args.imputation, par=args.par))
+        return nouveau
+    service = ServiceAnalyse(charger, args.entree, None if args.intervalle <= 0 else args.intervalle,
+                             verbeux=analyseur.verbeux)
+    try:
+        asyncio.run(service.servir(args.hote, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+def _commande_demo(analyseur: AnalyseurDonnees, args) -> None:
+    # enchaînement complet : génération, nettoyage, analyse du label 4, graphiques et rapport
     print("\n"+"="*30)
     print("ANALYSE DES DONNÉES DE PATIENTS")
     print("="*30+"\n")
-    
-    # initalisation de l'analyseur
-    analyseur = AnalyseurDonnees()
 
     # génération et sauvegarde des données
     print("\nGénération des données d'exemple")
     print("-"*30)
-    data = analyseur.generer_donnees_exemple(1000)
+    data = analyseur.generer_donnees_exemple(args.patients, args.graine)
     print(f"{len(data)} patients générés.")
     
     print("\nAperçu des données :")
@@ -314,10 +708,12 @@ def main():
     # analyse des patients avec label 4
     patients_label_4 = analyseur.analyser_patients('label', 4)
 
-    # affichage des visus
-    print("\nAffichage des visualisations")
-    print("-"*30)
-    analyseur.display_donnees(show_plot=False)
+    # affichage des visus (rendu en arrière-plan pendant la génération du rapport)
+    rendu = None
+    if not args.sans_graphique:
+        print("\nAffichage des visualisations")
+        print("-"*30)
+        rendu = analyseur.display_donnees(show_plot=False, asynchrone=True)
 
     # génération du rapport
     print("\nGénération du rapport")
@@ -329,6 +725,86 @@ def main():
     #export rapport
     analyseur.export_rapport('rapport_analyse.json')
 
-if __name__ == "__main__":
-    main()
+    if rendu is not None:
+        print(f"graphiques sauvegardés dans '{rendu.result()}'")
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Analyse des données de patients (sans argument : démonstration complète)")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+
+    # options communes à toutes les commandes
+    communes = argparse.ArgumentParser(add_help=False)
+    communes.add_argument('-q', '--silencieux', action='store_true', help="sans messages de progression")
+    communes.add_argument('--n-jobs', type=int, default=1, help="processus pour le nettoyage et la génération (-1 : tous les coeurs)")
+    entree = argparse.ArgumentParser(add_help=False)
+    entree.add_argument('-i', '--entree', default='donnees_patients.csv', help="fichier de données (.csv, .parquet, .feather, .npz) ou dossier partitionné")
+    entree.add_argument('--cache', action='store_true', help="cache en colonnes à côté du CSV (voir cache_colonnes.py)")
+    entree.add_argument('-f', '--filtre', action='append', default=[],
+                        help="colonne=valeur, colonne=a,b ou colonne=bas..haut (répétable ; élague les partitions)")
+    flux = argparse.ArgumentParser(add_help=False)
+    flux.add_argument('--flux', action='store_true', help="lecture du CSV par chunks, mémoire bornée")
+    flux.add_argument('--taille-chunk', type=int, default=100_000)
+
+    p = commandes.add_parser('generer', aliases=['generate'], parents=[communes], help="génère des patients d'exemple")
+    p.add_argument('-n', '--patients', type=int, default=1000)
+    p.add_argument('--graine', type=int, default=7)
+    p.add_argument('-o', '--sortie', default='donnees_patients.csv')
+    p.add_argument('--partitionner', action='append', help="écrit un dossier partitionné par cette colonne (répétable)")
+    p.add_argument('--format', choices=('csv',) + FORMATS, help="format des fichiers partitionnés")
+    p.set_defaults(fonction=_commande_generer)
+
+    p = commandes.add_parser('nettoyer', aliases=['clean'], parents=[communes, entree, flux], help="impute les valeurs manquantes")
+    p.add_argument('-o', '--sortie', default='donnees_nettoyees.csv')
+    p.add_argument('--imputation', choices=MODES_IMPUTATION, help="exact par défaut, approx en mode flux")
+    p.add_argument('--par', help="imputation par groupe (ex. label)")
+    p.set_defaults(fonction=_commande_nettoyer)
+
+    p = commandes.add_parser('analyser', aliases=['analyse'], parents=[communes, entree, flux], help="analyse un groupe de patients")
+    p.add_argument('--colonne', default='label')
+    p.add_argument('--valeur', default='4')
+    p.add_argument('-o', '--sortie', help="CSV des patients du groupe")
+    p.set_defaults(fonction=_commande_analyser)
+
+    p = commandes.add_parser('rapport', aliases=['report'], parents=[communes, entree, flux], help="exporte le rapport JSON")
+    p.add_argument('-o', '--sortie', default='rapport_analyse.json')
+    p.add_argument('--mode', choices=MODES, default='indent')
+    p.add_argument('--compression', choices=sorted(COMPRESSIONS), help="déduite de l'extension par défaut")
+    p.add_argument('--correlations', action='store_true', help="ajoute les matrices de corrélation")
+    p.set_defaults(fonction=_commande_rapport)
+
+    p = commandes.add_parser('graphique', aliases=['plot'], parents=[communes, entree], help="dessine les graphiques")
+    p.add_argument('-o', '--sortie', default='analyse_patients.png')
+    p.add_argument('--dpi', type=int, default=300)
+    p.add_argument('--afficher', action='store_true', help="ouvre aussi une fenêtre matplotlib")
+    p.set_defaults(fonction=_commande_graphique)
+
+    p = commandes.add_parser('servir', aliases=['serve'], parents=[communes, entree],
+                             help="garde les données nettoyées en mémoire et répond en HTTP (voir service.py)")
+    p.add_argument('--hote', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--socket', help="socket Unix à la place du port TCP")
+    p.add_argument('--intervalle', type=float, default=1.0, help="secondes entre deux vérifications du fichier (0 : jamais)")
+    p.add_argument('--imputation', choices=MODES_IMPUTATION, default='exact')
+    p.add_argument('--par', help="imputation par groupe (ex. label)")
+    p.set_defaults(fonction=_commande_servir)
+
+    p = commandes.add_parser('demo', parents=[communes], help="enchaînement complet (comportement par défaut)")
+    p.add_argument('-n', '--patients', type=int, default=1000)
+    p.add_argument('--graine', type=int, default=7)
+    p.add_argument('--sans-graphique', action='store_true', help="sans rendu des graphiques (ni import de matplotlib)")
+    p.set_defaults(fonction=_commande_demo)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = _parser().parse_args(argv or ['demo'])
+    if getattr(args, 'entree', None) and not os.path.exists(args.entree):
+        raise SystemExit(f"{args.entree} non trouvé.")
+    analyseur = AnalyseurDonnees(verbeux=not args.silencieux)
+    args.fonction(analyseur, args)
+    return 0
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+generation.py
+Génération vectorisée des données patients par chunks.
+Chaque chunk a son propre flux aléatoire (SeedSequence.spawn) : le résultat est reproductible
+quel que soit le nombre de threads, et les chunks peuvent être générés en parallèle
+puis écrits sur disque sans jamais matérialiser tout le jeu de données.
+Les valeurs manquantes utilisent des types nullables (Int16/Int8, catégories) : pas de conversion en float.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from cache_colonnes import ecrire_colonnes, format_par_defaut
+
+
+TAUX_MANQUANTS = 0.01   # environ 1% de valeurs manquantes par colonne
+PROBAS_LABELS = [0.3, 0.25, 0.2, 0.15, 0.1]
+CUMUL_LABELS = np.cumsum(PROBAS_LABELS)[:-1]   # tirage des labels 1..5 par searchsorted
+
+
+def identifiants(debut: int, fin: int, largeur: int = 4) -> np.ndarray:
+    """Identifiants 'P0001'... construits chiffre par chiffre dans un tableau d'octets (pas de f-string par ligne)."""
+    largeur = max(largeur, len(str(max(fin - 1, 0))))
+    reste = np.arange(debut, fin, dtype=np.int64)
+    octets = np.empty((len(reste), largeur + 1), dtype=np.uint8)
+    octets[:, 0] = ord('P')
+    for j in range(largeur, 0, -1):
+        reste, chiffre = np.divmod(reste, 10)
+        octets[:, j] = chiffre
+    octets[:, 1:] += ord('0')
+    return octets.view(f'S{largeur + 1}').ravel().astype(str)
+
+
+def _manquants(rng: np.random.Generator, n: int) -> np.ndarray:
+    return rng.random(n) < TAUX_MANQUANTS
+
+
+def _mesure(rng: np.random.Generator, n: int, moyenne: float, ecart_type: float, decimales: int) -> np.ndarray:
+    valeurs = rng.normal(moyenne, ecart_type, n).round(decimales)
+    valeurs[_manquants(rng, n)] = np.nan
+    return valeurs
+
+
+def generer_chunk(debut: int, n: int, graine: np.random.SeedSequence, largeur_ids: int = 4) -> pd.DataFrame:
+    rng = np.random.default_rng(graine)
+    # codes 0 = F, 1 = H : catégories dans l'ordre alphabétique, comme les tableaux croisés
+    sexe = 1 - rng.integers(0, 2, n, dtype=np.int8)
+    sexe[_manquants(rng, n)] = -1
+    return pd.DataFrame({
+        'patientId': identifiants(debut + 1, debut + n + 1, largeur_ids),
+        'age': pd.arrays.IntegerArray(rng.integers(20, 80, n, dtype=np.int16), _manquants(rng, n)),
+        'sexe': pd.Categorical.from_codes(sexe, ['F', 'H']),
+        'poids': _mesure(rng, n, 70, 15, 1),
+        'taille': _mesure(rng, n, 170, 10, 0),
+        'tensionSystolique': _mesure(rng, n, 120, 20, 0),
+        'tensionDiastolique': _mesure(rng, n, 80, 10, 0),
+        'cholesterol': _mesure(rng, n, 200, 40, 0),
+        'glucose': _mesure(rng, n, 100, 25, 0),
+        'label': pd.arrays.IntegerArray((np.searchsorted(CUMUL_LABELS, rng.random(n), side='right') + 1).astype(np.int8),
+                                        _manquants(rng, n)),
+    }, index=pd.RangeIndex(debut, debut + n))
+
+
+def generer_patients(n_patients: int, graine: int = 7, taille_chunk: int = 1_000_000,
+                     n_jobs: int = 1) -> Iterator[pd.DataFrame]:
+    """Chunks de patients dans l'ordre ; générés dans n_jobs threads (numpy relâche le GIL)."""
+    # n_patients = 0 : un chunk vide, pour garder le schéma
+    debuts = list(range(0, n_patients, taille_chunk)) or [0]
+    graines = np.random.SeedSequence(graine).spawn(len(debuts))
+    largeur = len(str(n_patients))
+    taches = [(debut, min(taille_chunk, n_patients - debut), g) for debut, g in zip(debuts, graines)]
+    if n_jobs == 1:
+        for debut, n, g in taches:
+            yield generer_chunk(debut, n, g, largeur)
+        return
+    with ThreadPoolExecutor(max_workers=n_jobs if n_jobs > 0 else os.cpu_count()) as executeur:
+        # map garde l'ordre ; on limite les chunks en vol pour borner la mémoire
+        en_vol = max(1, n_jobs if n_jobs > 0 else os.cpu_count()) * 2
+        for i in range(0, len(taches), en_vol):
+            yield from executeur.map(lambda t: generer_chunk(t[0], t[1], t[2], largeur), taches[i:i + en_vol])
+
+
+def ecrire_patients(n_patients: int, destination: str, graine: int = 7, taille_chunk: int = 1_000_000,
+                    n_jobs: int = 1, format: Optional[str] = None) -> int:
+    """
+    Écrit les patients générés sans tout garder en mémoire :
+    - destination en .csv : un seul CSV écrit chunk par chunk ;
+    - sinon : un dossier de fichiers part-00000.<format> (parquet/feather/npz).
+    """
+    total = 0
+    if destination.endswith('.csv'):
+        for i, chunk in enumerate(generer_patients(n_patients, graine, taille_chunk, n_jobs)):
+            chunk.to_csv(destination, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            total += len(chunk)
+        return total
+    format = format or format_par_defaut()
+    os.makedirs(destination, exist_ok=True)
+    for i, chunk in enumerate(generer_patients(n_patients, graine, taille_chunk, n_jobs)):
+        ecrire_colonnes(chunk, os.path.join(destination, f'part-{i:05d}.{format}'), format)
+        total += len(chunk)
+    return total
@@ -0,0 +1,89 @@
+"""
+imputation.py
+Stratégies d'imputation des valeurs manquantes (médiane des colonnes numériques, mode des autres).
+- mode 'exact' : mêmes valeurs que median() / mode() de pandas ; la mémoire dépend du nombre
+  de valeurs distinctes (comptes), pas du nombre de lignes ;
+- mode 'approx' : sketch KLL pour les médianes et Misra-Gries pour les modes, mémoire bornée
+  par les erreurs tolérées.
+Les états (agregats.EtatImputation) se fusionnent entre chunks et processus, ce qui permet
+de nettoyer un fichier plus grand que la mémoire en deux passes (mode flux).
+par='label' impute chaque ligne avec la médiane / le mode de son groupe.
+
+    strategie = StrategieImputation('approx', erreur_rang=0.001, par='label')
+    etat = strategie.etat()
+    for chunk in chunks:
+        etat.mettre_a_jour(chunk)
+    chunk_nettoye = strategie.appliquer(chunk, etat)
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agregats import EtatImputation
+
+
+MODES_IMPUTATION = ('exact', 'approx')
+
+
+class StrategieImputation:
+    """
+    erreur_rang : erreur tolérée sur le rang de la médiane, en fraction des lignes (mode approx) ;
+    erreur_frequence : erreur tolérée sur les fréquences des modes, en fraction des lignes (mode approx).
+    """
+    def __init__(self, mode: str = 'exact', erreur_rang: float = 0.001, erreur_frequence: float = 0.001,
+                 par: Optional[str] = None) -> None:
+        if mode not in MODES_IMPUTATION:
+            raise ValueError(f"Mode d'imputation inconnu : {mode} (attendu : {', '.join(MODES_IMPUTATION)})")
+        self.mode = mode
+        self.erreur_rang = erreur_rang
+        self.erreur_frequence = erreur_frequence
+        self.par = par
+
+    @property
+    def precision_k(self) -> int:
+        # erreur de rang d'un sketch KLL de paramètre k : environ 1.7 / k
+        return int(np.ceil(1.7 / self.erreur_rang))
+
+    @property
+    def capacite_modes(self) -> int:
+        # Misra-Gries avec m compteurs : erreur <= n / (m + 1)
+        return int(np.ceil(1 / self.erreur_frequence))
+
+    def etat(self, colonnes_num: Optional[List[str]] = None, colonnes_cat: Optional[List[str]] = None,
+             colonnes_ignorees: Tuple[str, ...] = ()) -> EtatImputation:
+        return EtatImputation(colonnes_num, colonnes_cat, self.mode == 'approx', self.precision_k,
+                              self.capacite_modes, self.par, colonnes_ignorees)
+
+    def appliquer(self, df: pd.DataFrame, etat: EtatImputation) -> pd.DataFrame:
+        """Remplace les valeurs manquantes de df (modifié en place et renvoyé)."""
+        valeurs = etat.valeurs()
+        par_groupe = etat.valeurs_par_groupe() if self.par is not None else {}
+        groupes = df[self.par] if par_groupe else None
+
+        for col, valeur in valeurs.items():
+            if col == self.par or col not in df.columns or not df[col].hasnans:
+                continue
+            remplissage = [valeur]
+            if groupes is not None:
+                # valeur du groupe de chaque ligne, la valeur globale pour les groupes inconnus
+                remplissage = [v.get(col, np.nan) for v in par_groupe.values()] + remplissage
+            numerique = pd.api.types.is_numeric_dtype(df[col])
+            if numerique and pd.api.types.is_integer_dtype(df[col]) \
+                    and any(pd.notna(v) and v % 1 != 0 for v in remplissage):
+                # schéma compact (Int8/Int16) : une médiane x.5 ne rentre pas dans un entier
+                df[col] = df[col].astype('float32')
+            if groupes is not None:
+                correspondance = {g: v[col] for g, v in par_groupe.items() if col in v and pd.notna(v[col])}
+                par_ligne = groupes.map(correspondance)
+                df[col] = df[col].fillna(par_ligne.astype(float) if numerique else par_ligne)
+            df[col] = df[col].fillna(valeur)
+
+        # la colonne de regroupement elle-même est imputée en dernier, avec sa valeur globale
+        if self.par is not None and self.par in valeurs and self.par in df.columns:
+            valeur = valeurs[self.par]
+            if pd.api.types.is_integer_dtype(df[self.par]) and pd.notna(valeur) and valeur % 1 != 0:
+                df[self.par] = df[self.par].astype('float32')
+            df[self.par] = df[self.par].fillna(valeur)
+        return df
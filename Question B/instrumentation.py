@@ -0,0 +1,133 @@
+"""
+instrumentation.py
+Mesure des étapes de AnalyseurDonnees : durée, lignes traitées, octets alloués et pic mémoire.
+Les mesures sont envoyées à des puits interchangeables :
+- EnregistreurMemoire : garde les mesures dans une liste (tests, notebooks) ;
+- FichierJsonLignes : une ligne JSON par étape ;
+- ProfileurCProfile : profil cProfile de chaque étape.
+Sans instrumentation (valeur par défaut), le décorateur ne coûte qu'un test sur None.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+class EnregistreurMemoire:
+    def __init__(self) -> None:
+        self.mesures: List[Dict] = []
+
+    def enregistrer(self, mesure: Dict) -> None:
+        self.mesures.append(mesure)
+
+    def resume(self) -> pd.DataFrame:
+        return pd.DataFrame(self.mesures)
+
+
+class FichierJsonLignes:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def enregistrer(self, mesure: Dict) -> None:
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(mesure) + '\n')
+
+
+class ProfileurCProfile:
+    """Profile chaque étape avec cProfile ; stats(etape) renvoie le rapport texte."""
+    def __init__(self, tri: str = 'cumulative') -> None:
+        self.tri = tri
+        self.profils: Dict[str, cProfile.Profile] = {}
+        self._actifs: List[cProfile.Profile] = []
+
+    def debut(self, etape: str) -> None:
+        # un seul profil actif à la fois (cProfile ne supporte pas l'imbrication)
+        if self._actifs:
+            self._actifs.append(None)
+            return
+        profil = self.profils.setdefault(etape, cProfile.Profile())
+        self._actifs.append(profil)
+        profil.enable()
+
+    def enregistrer(self, mesure: Dict) -> None:
+        profil = self._actifs.pop()
+        if profil is not None:
+            profil.disable()
+
+    def stats(self, etape: str, limite: int = 20) -> str:
+        sortie = io.StringIO()
+        pstats.Stats(self.profils[etape], stream=sortie).sort_stats(self.tri).print_stats(limite)
+        return sortie.getvalue()
+
+
+class Instrumentation:
+    """
+    Collecte les mesures des étapes et les transmet aux puits.
+    memoire=True active tracemalloc (octets alloués et pic par étape), ce qui ralentit les allocations.
+    """
+    def __init__(self, puits: Optional[List] = None, memoire: bool = False) -> None:
+        self.puits = list(puits or [])
+        self.memoire = memoire
+        self._profondeur = 0
+
+    def ajouter_puits(self, puits) -> 'Instrumentation':
+        self.puits.append(puits)
+        return self
+
+    @contextmanager
+    def etape(self, nom: str):
+        mesure = {'etape': nom, 'debut': time.time(), 'profondeur': self._profondeur}
+        # la mémoire n'est mesurée que pour l'étape la plus externe (le pic est global à tracemalloc)
+        suivre_memoire = self.memoire and self._profondeur == 0
+        if suivre_memoire:
+            demarre_ici = not tracemalloc.is_tracing()
+            if demarre_ici:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            avant, _ = tracemalloc.get_traced_memory()
+        for puits in self.puits:
+            if hasattr(puits, 'debut'):
+                puits.debut(nom)
+        self._profondeur += 1
+        chrono = time.perf_counter()
+        try:
+            yield mesure
+        finally:
+            mesure['duree_s'] = time.perf_counter() - chrono
+            self._profondeur -= 1
+            if suivre_memoire:
+                apres, pic = tracemalloc.get_traced_memory()
+                mesure['octets_alloues'] = apres - avant
+                mesure['pic_memoire'] = pic - avant
+                if demarre_ici:
+                    tracemalloc.stop()
+            for puits in self.puits:
+                puits.enregistrer(mesure)
+
+
+def instrumenter(nom: Optional[str] = None) -> Callable:
+    """Décorateur pour les méthodes de AnalyseurDonnees (utilise self.instrumentation si elle existe)."""
+    def decorateur(methode: Callable) -> Callable:
+        etape = nom or methode.__name__
+
+        @functools.wraps(methode)
+        def enveloppe(self, *args, **kwargs):
+            if self.instrumentation is None:
+                return methode(self, *args, **kwargs)
+            with self.instrumentation.etape(etape) as mesure:
+                resultat = methode(self, *args, **kwargs)
+                if isinstance(resultat, pd.DataFrame):
+                    mesure['lignes'] = len(resultat)
+                elif getattr(self, '_donnees', None) is not None:
+                    mesure['lignes'] = len(self._donnees)
+            return resultat
+        return enveloppe
+    return decorateur
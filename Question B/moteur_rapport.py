@@ -0,0 +1,83 @@
+"""
+moteur_rapport.py
+Calcul du rapport de generer_rapport en une seule passe vectorisée :
+les colonnes utiles sont extraites une fois dans une matrice, les masques
+(valeurs présentes, groupes, hypertension) sont calculés une fois et partagés
+entre tous les agrégats. Les groupes décrits sont paramétrables (pas seulement label 4).
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+COLONNES_RAPPORT = ['age', 'imc', 'tensionSystolique', 'tensionDiastolique', 'cholesterol', 'glucose']
+GROUPES_PAR_DEFAUT: Dict[str, Tuple[str, Any]] = {'patients_label_4': ('label', 4)}
+
+
+class MoteurRapport:
+    def __init__(self, groupes: Optional[Dict[str, Tuple[str, Any]]] = None,
+                 seuil_hypertension: float = 140) -> None:
+        self.groupes = GROUPES_PAR_DEFAUT if groupes is None else groupes
+        self.seuil_hypertension = seuil_hypertension
+
+    def _matrice(self, df: pd.DataFrame) -> np.ndarray:
+        # ordre Fortran : chaque colonne est contiguë pour les réductions axis=0
+        matrice = np.empty((len(df), len(COLONNES_RAPPORT)), order='F')
+        for j, col in enumerate(COLONNES_RAPPORT):
+            matrice[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        return matrice
+
+    def _masque_groupe(self, df: pd.DataFrame, matrice: np.ndarray, col: str, val) -> np.ndarray:
+        if col in COLONNES_RAPPORT:
+            return matrice[:, COLONNES_RAPPORT.index(col)] == val
+        return (df[col] == val).to_numpy(dtype=bool, na_value=False)
+
+    def calculer(self, df: pd.DataFrame) -> Dict:
+        n = len(df)
+        matrice = self._matrice(df)
+        presents = ~np.isnan(matrice)
+        valeurs = np.where(presents, matrice, 0.0)
+        comptes = presents.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moyennes = valeurs.sum(axis=0) / comptes
+        moyenne = {col: float(moyennes[j]) for j, col in enumerate(COLONNES_RAPPORT)}
+
+        i_age = COLONNES_RAPPORT.index('age')
+        ages = matrice[presents[:, i_age], i_age]
+        hypertendus = int((matrice[:, COLONNES_RAPPORT.index('tensionSystolique')] > self.seuil_hypertension).sum())
+        sexes = df['sexe'].value_counts()
+        ids = df['patientId'].to_numpy()
+
+        groupes = {}
+        for nom, (col, val) in self.groupes.items():
+            masque = self._masque_groupe(df, matrice, col, val)
+            n_groupe = int(masque.sum())
+            n_ages = int(presents[masque, i_age].sum())
+            groupes[nom] = {
+                'nombre': n_groupe,
+                'pourcentage': n_groupe / n * 100 if n > 0 else 0,
+                'age_moyen': float(valeurs[masque, i_age].sum() / n_ages) if n_ages > 0 else (0 if n_groupe == 0 else np.nan),
+                'liste_ids': ids[masque].tolist()
+            }
+
+        return {
+            'resume_general': {
+                'nombre_total_patients': n,
+                'age_moyen': moyenne['age'],
+                'age_min': float(ages.min()) if len(ages) > 0 else np.nan,
+                'age_max': float(ages.max()) if len(ages) > 0 else np.nan,
+                'ratio_hommes_femmes': f"{int(sexes.get('M', 0))}:{int(sexes.get('F', 0))}",
+                'imc_moyen': moyenne['imc']
+            },
+            'distribution_labels': {(k.item() if isinstance(k, np.generic) else k): int(v)
+                                    for k, v in df['label'].value_counts().items()},
+            **groupes,
+            'statistiques_sante': {
+                'tension_moyenne': f"{moyenne['tensionSystolique']:.0f}/{moyenne['tensionDiastolique']:.0f}",
+                'cholesterol_moyen': moyenne['cholesterol'],
+                'glucose_moyen': moyenne['glucose'],
+                'patients_hypertendus': hypertendus
+            }
+        }
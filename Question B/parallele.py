@@ -0,0 +1,63 @@
+"""
+parallele.py
+Exécution parallèle par tranches de lignes : chaque tranche calcule des agrégats partiels
+dans un pool de processus (EtatImputation pour les médianes/modes, EtatRapport pour le rapport),
+puis on fusionne les résultats. En mode exact, les médianes et modes obtenus sont ceux du chemin série.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agregats import EtatRapport
+
+
+def nombre_workers(n_jobs: int) -> int:
+    # même convention que joblib / scikit-learn : -1 = tous les coeurs
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def tranches(n: int, n_parties: int) -> List[Tuple[int, int]]:
+    bornes = np.linspace(0, n, n_parties + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bornes[:-1], bornes[1:]) if b > a]
+
+
+def map_partitions(fonction: Callable, df: pd.DataFrame, n_jobs: int, *args) -> List:
+    n = nombre_workers(n_jobs)
+    parties = [df.iloc[a:b] for a, b in tranches(len(df), n)]
+    if n == 1 or len(parties) <= 1:
+        return [fonction(partie, *args) for partie in parties]
+    with ProcessPoolExecutor(max_workers=n) as executeur:
+        return list(executeur.map(fonction, parties, *[[arg] * len(parties) for arg in args]))
+
+
+def _etat_imputation(partie: pd.DataFrame, strategie, colonnes_num: List[str], colonnes_cat: List[str]):
+    return strategie.etat(colonnes_num, colonnes_cat).mettre_a_jour(partie).compacter()
+
+
+def etat_imputation_parallele(df: pd.DataFrame, strategie, colonnes_num: List[str], colonnes_cat: List[str],
+                              n_jobs: int = -1):
+    """État d'imputation (imputation.StrategieImputation) calculé par tranches puis fusionné."""
+    etats = map_partitions(_etat_imputation, df, n_jobs, strategie, colonnes_num, colonnes_cat)
+    etat = etats[0] if etats else strategie.etat(colonnes_num, colonnes_cat)
+    for autre in etats[1:]:
+        etat.fusionner(autre)
+    return etat
+
+
+def _etat_rapport(partie: pd.DataFrame, groupes: Optional[Dict[str, Tuple[str, Any]]]) -> EtatRapport:
+    return EtatRapport(groupes).mettre_a_jour(partie)
+
+
+def rapport_parallele(df: pd.DataFrame, groupes: Optional[Dict[str, Tuple[str, Any]]] = None,
+                      n_jobs: int = -1) -> Dict:
+    etats = map_partitions(_etat_rapport, df, n_jobs, groupes)
+    etat = etats[0] if etats else EtatRapport(groupes)
+    for autre in etats[1:]:
+        etat.fusionner(autre)
+    return etat.rapport()
@@ -0,0 +1,275 @@
+"""
+partitions.py
+Jeux de données répartis en plusieurs fichiers rangés par dossiers clé=valeur (style Hive) :
+
+    patients/
+        _metadonnees.json
+        label=4/part-00000.npz
+        label=4/date=2026-10-17/export.csv
+
+Les filtres (prédicats de requetes.py) sont appliqués en trois temps :
+- élagage des partitions : les dossiers dont la valeur ne convient pas ne sont pas lus ;
+- élagage par statistiques : min / max et valeurs présentes de chaque fichier ;
+- filtre des lignes des fichiers restants, en ne lisant que les colonnes utiles.
+Les fichiers sont lus en parallèle (pool de threads). Les statistiques de chaque fichier
+(lignes, StatColonne des colonnes numériques, comptes des colonnes peu variées, hypertendus)
+sont gardées dans _metadonnees.json : un rapport filtré sur les clés de partition se calcule
+sans lire les données, à part la colonne patientId des groupes.
+
+    jeu = JeuPartitionne.ecrire(df, 'patients', par=['label'])
+    df_4 = jeu.lire([Egal('label', 4), Intervalle('age', 60)])
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from agregats import CompteurValeurs, EtatRapport, StatColonne
+from cache_colonnes import appliquer_schema, ecrire_colonnes, format_depuis_chemin, format_par_defaut, lire_colonnes
+from colonnes_derivees import COLONNES_DERIVEES, calculer_derivees, sources_necessaires
+from requetes import SEUIL_CARDINALITE, valeur_depuis_texte
+
+
+FICHIER_METADONNEES = '_metadonnees.json'
+VALEUR_NULLE = '__HIVE_DEFAULT_PARTITION__'   # même nom que Hive pour une clé manquante
+SEUIL_HYPERTENSION = 140                      # celui de EtatRapport / MoteurRapport par défaut
+
+
+def _texte_partition(valeur) -> str:
+    if pd.isna(valeur):
+        return VALEUR_NULLE
+    return quote(str(valeur.item() if isinstance(valeur, np.generic) else valeur), safe='')
+
+
+def _valeur_partition(texte: str):
+    return None if texte == VALEUR_NULLE else valeur_depuis_texte(unquote(texte))
+
+
+def _empreinte(path: str) -> List[int]:
+    infos = os.stat(path)
+    return [infos.st_size, infos.st_mtime_ns]
+
+
+def statistiques(df: pd.DataFrame) -> Dict:
+    """Statistiques fusionnables d'un fichier (colonnes dérivées comprises) pour les métadonnées."""
+    df = calculer_derivees(df)
+    numeriques, comptes = {}, {}
+    for col in df.columns:
+        serie = df[col]
+        if col == 'patientId':
+            continue
+        if pd.api.types.is_numeric_dtype(serie):
+            numeriques[col] = vars(StatColonne().mettre_a_jour(serie.to_numpy(dtype=float, na_value=np.nan)))
+        if not pd.api.types.is_numeric_dtype(serie) or serie.nunique() <= SEUIL_CARDINALITE:
+            # paires [valeur, nombre] : les clés JSON perdraient le type des valeurs
+            comptes[col] = [[v, int(n)] for v, n in CompteurValeurs().mettre_a_jour(serie).comptes.items()]
+    hypertendus = int((df['tensionSystolique'] > SEUIL_HYPERTENSION).sum()) if 'tensionSystolique' in df else 0
+    return {'lignes': len(df), 'numeriques': numeriques, 'comptes': comptes, 'hypertendus': hypertendus}
+
+
+def _stat_colonne(valeurs: Optional[Dict]) -> StatColonne:
+    stat = StatColonne()
+    if valeurs is not None:
+        vars(stat).update(valeurs)
+    return stat
+
+
+class FichierPartition:
+    def __init__(self, chemin: str, partition: Dict[str, Any], empreinte: List[int],
+                 stats: Optional[Dict] = None) -> None:
+        self.chemin = chemin             # relatif au dossier du jeu de données
+        self.partition = partition       # {clé: valeur} lu dans les noms de dossiers
+        self.empreinte = empreinte       # [taille, mtime_ns] : des statistiques d'un autre contenu sont ignorées
+        self.stats = stats
+
+    def garder(self, filtres: Sequence) -> bool:
+        """Faux si aucun prédicat ne peut être vrai dans ce fichier (clé de partition ou statistiques)."""
+        for predicat in filtres:
+            if predicat.colonne in self.partition:
+                if not predicat.masque(pd.Series([self.partition[predicat.colonne]], dtype=object))[0]:
+                    return False
+                continue
+            if self.stats is None:
+                continue
+            stat = self.stats['numeriques'].get(predicat.colonne)
+            if stat is not None and (stat['n'] == 0 or not predicat.peut_correspondre(stat['min'], stat['max'])):
+                return False
+            comptes = self.stats['comptes'].get(predicat.colonne)
+            if comptes is not None and not predicat.masque(pd.Series([v for v, _ in comptes], dtype=object)).any():
+                return False
+        return True
+
+
+class JeuPartitionne:
+    def __init__(self, dossier: str, n_threads: int = 4) -> None:
+        self.dossier = dossier
+        self.n_threads = n_threads
+        self.cles: List[str] = []
+        self.fichiers: List[FichierPartition] = []
+        self._modifie = False
+        self.decouvrir()
+
+    @classmethod
+    def ecrire(cls, df: pd.DataFrame, dossier: str, par: Iterable[str] = ('label',),
+               format: Optional[str] = None, nom: Optional[str] = None) -> 'JeuPartitionne':
+        """
+        Ajoute df au jeu de données, un fichier par combinaison des colonnes `par`
+        (retirées des fichiers : leur valeur est dans le chemin). format : 'csv', 'parquet', 'feather' ou 'npz' ;
+        nom : nom des fichiers (ex. export-2026-10-17), sinon part-00000, part-00001... dans chaque dossier.
+        """
+        par = list(par)
+        format = format or format_par_defaut()
+        jeu = cls(dossier)
+        groupes = df.groupby(par, dropna=False, observed=True, sort=True) if par else [((), df)]
+        for valeurs, partie in groupes:
+            valeurs = valeurs if isinstance(valeurs, tuple) else (valeurs,)
+            relatif = os.path.join(*[f'{col}={_texte_partition(v)}' for col, v in zip(par, valeurs)]) if par else ''
+            os.makedirs(os.path.join(dossier, relatif), exist_ok=True)
+            if nom is None:
+                existants = [f for f in os.listdir(os.path.join(dossier, relatif)) if f.startswith('part-')]
+                chemin = os.path.join(relatif, f'part-{len(existants):05d}.{format}')
+            else:
+                chemin = os.path.join(relatif, f'{nom}.{format}')
+            contenu = partie.drop(columns=par + [c for c in COLONNES_DERIVEES if c in partie.columns])
+            if format == 'csv':
+                contenu.to_csv(os.path.join(dossier, chemin), index=False)
+            else:
+                ecrire_colonnes(contenu.reset_index(drop=True), os.path.join(dossier, chemin), format)
+            partition = {col: _valeur_partition(_texte_partition(v)) for col, v in zip(par, valeurs)}
+            jeu._ajouter(FichierPartition(chemin, partition, _empreinte(os.path.join(dossier, chemin)),
+                                          statistiques(partie)))
+        jeu.sauvegarder_metadonnees()
+        return jeu
+
+    def _ajouter(self, fichier: FichierPartition) -> None:
+        self.fichiers = [f for f in self.fichiers if f.chemin != fichier.chemin] + [fichier]
+        self.fichiers.sort(key=lambda f: f.chemin)
+        for cle in fichier.partition:
+            if cle not in self.cles:
+                self.cles.append(cle)
+        self._modifie = True
+
+    def decouvrir(self) -> None:
+        """Parcourt le dossier ; les statistiques des métadonnées sont reprises si le fichier n'a pas changé."""
+        connues = {}
+        chemin_meta = os.path.join(self.dossier, FICHIER_METADONNEES)
+        if os.path.exists(chemin_meta):
+            with open(chemin_meta) as f:
+                connues = {entree['chemin']: entree for entree in json.load(f)['fichiers']}
+        self.fichiers, self.cles, self._modifie = [], [], False
+        for racine, dossiers, noms in os.walk(self.dossier):
+            dossiers.sort()
+            relatif = os.path.relpath(racine, self.dossier)
+            segments = [] if relatif == '.' else relatif.split(os.sep)
+            if any('=' not in segment for segment in segments):
+                continue
+            partition = {cle: _valeur_partition(texte) for cle, texte in (s.split('=', 1) for s in segments)}
+            for nom in sorted(noms):
+                if nom.startswith(('_', '.')) or not (nom.endswith('.csv') or format_depuis_chemin(nom)):
+                    continue
+                chemin = os.path.normpath(os.path.join(relatif, nom))
+                empreinte = _empreinte(os.path.join(self.dossier, chemin))
+                entree = connues.get(chemin)
+                stats = entree['stats'] if entree is not None and entree['empreinte'] == empreinte else None
+                self._ajouter(FichierPartition(chemin, partition, empreinte, stats))
+        self._modifie = len(connues) != len(self.fichiers) or any(f.stats is None for f in self.fichiers)
+
+    def sauvegarder_metadonnees(self) -> None:
+        entrees = [{'chemin': f.chemin, 'partition': {c: _texte_partition(v) for c, v in f.partition.items()},
+                    'empreinte': f.empreinte, 'stats': f.stats} for f in self.fichiers]
+        with open(os.path.join(self.dossier, FICHIER_METADONNEES), 'w') as f:
+            json.dump({'cles': self.cles, 'fichiers': entrees}, f)
+        self._modifie = False
+
+    def selection(self, filtres: Sequence = ()) -> List[FichierPartition]:
+        return [f for f in self.fichiers if f.garder(filtres)]
+
+    def _lire_fichier(self, fichier: FichierPartition, filtres: Sequence, colonnes: Optional[List[str]]) -> pd.DataFrame:
+        chemin = os.path.join(self.dossier, fichier.chemin)
+        lecture = None
+        if colonnes is not None:
+            utiles = sources_necessaires(list(colonnes) + [p.colonne for p in filtres])
+            lecture = [c for c in utiles if c not in fichier.partition]
+        df = pd.read_csv(chemin, usecols=lecture) if chemin.endswith('.csv') else lire_colonnes(chemin, lecture)
+        for cle, valeur in fichier.partition.items():
+            if cle not in df.columns:
+                df[cle] = valeur if valeur is not None else pd.Series(None, index=df.index, dtype=object)
+        if fichier.stats is None and lecture is None:
+            # fichier ajouté à la main : ses statistiques sont calculées au passage
+            fichier.stats = statistiques(df)
+            self._modifie = True
+
+        # filtres des colonnes qui ne sont pas des clés de partition (dérivées recalculées si besoin)
+        restants = [p for p in filtres if p.colonne not in fichier.partition]
+        if restants:
+            df = calculer_derivees(df, [p.colonne for p in restants if p.colonne not in df.columns])
+            masque = np.ones(len(df), dtype=bool)
+            for predicat in restants:
+                masque &= predicat.masque(df[predicat.colonne])
+            df = df[masque]
+        return df if colonnes is None else calculer_derivees(df, colonnes)[list(colonnes)]
+
+    def lire(self, filtres: Sequence = (), colonnes: Optional[List[str]] = None) -> pd.DataFrame:
+        """Lignes des fichiers retenus qui vérifient tous les filtres, avec le schéma compact."""
+        fichiers = self.selection(filtres)
+        with ThreadPoolExecutor(max_workers=max(1, self.n_threads)) as executeur:
+            parties = list(executeur.map(lambda f: self._lire_fichier(f, filtres, colonnes), fichiers))
+        if self._modifie:
+            self.sauvegarder_metadonnees()
+        if not parties:
+            # aucun fichier retenu : mêmes colonnes, zéro ligne
+            if not self.fichiers:
+                return pd.DataFrame(columns=colonnes or [])
+            parties = [self._lire_fichier(self.fichiers[0], (), colonnes).iloc[:0]]
+        return appliquer_schema(pd.concat(parties, ignore_index=True))
+
+    def indexer(self) -> None:
+        """Calcule les statistiques des fichiers qui n'en ont pas (lecture complète de ces fichiers seulement)."""
+        manquants = [f for f in self.fichiers if f.stats is None]
+        with ThreadPoolExecutor(max_workers=max(1, self.n_threads)) as executeur:
+            list(executeur.map(lambda f: self._lire_fichier(f, (), None), manquants))
+        if self._modifie:
+            self.sauvegarder_metadonnees()
+
+    def etat_rapport(self, filtres: Sequence = (), groupes: Optional[Dict] = None) -> Optional[EtatRapport]:
+        """
+        EtatRapport construit depuis les métadonnées si les filtres et les groupes ne portent que sur des clés
+        de partition ; seule la colonne patientId des fichiers des groupes est lue. None sinon.
+        """
+        etat = EtatRapport(groupes)
+        if etat.seuil_hypertension != SEUIL_HYPERTENSION \
+                or any(p.colonne not in self.cles for p in filtres) \
+                or any(col not in self.cles for col, _ in etat.groupes.values()):
+            return None
+        fichiers = self.selection(filtres)
+        if any(f.stats is None for f in fichiers):
+            return None
+
+        a_lire: Dict[str, List[FichierPartition]] = {nom: [] for nom in etat.groupes}
+        for fichier in fichiers:
+            stats = fichier.stats
+            etat.n += stats['lignes']
+            for col, stat in etat.stats.items():
+                stat.fusionner(_stat_colonne(stats['numeriques'].get(col)))
+            etat.sexes.comptes.update({v: n for v, n in stats['comptes'].get('sexe', [])})
+            etat.labels.comptes.update({v: n for v, n in stats['comptes'].get('label', [])})
+            etat.hypertendus += stats['hypertendus']
+            for nom, (col, val) in etat.groupes.items():
+                if fichier.partition.get(col) == val:
+                    etat.n_groupes[nom] += stats['lignes']
+                    etat.age_groupes[nom].fusionner(_stat_colonne(stats['numeriques'].get('age')))
+                    a_lire[nom].append(fichier)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.n_threads)) as executeur:
+            for nom, fichiers_groupe in a_lire.items():
+                for ids in executeur.map(lambda f: self._lire_fichier(f, (), ['patientId'])['patientId'], fichiers_groupe):
+                    etat.ids_groupes[nom].extend(ids.tolist())
+        return etat
+
+    def __len__(self) -> int:
+        return len(self.fichiers)
@@ -0,0 +1,279 @@
+"""
+rendu.py
+Rendu du tableau de bord de display_donnees en deux temps :
+1. préparation des panneaux : agrégation numpy (comptes, histogrammes, histogramme 2D,
+   statistiques de boîtes, corrélations) dont la taille ne dépend pas du nombre de patients ;
+2. dessin à partir de ces agrégats seulement, dans une Figure matplotlib sans pyplot
+   (utilisable dans un thread en arrière-plan).
+Le dessin ne dépend donc plus du nombre de lignes, et chaque panneau peut être rendu séparément.
+"""
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from correlations import COLONNES_CORRELATION, CorrelationsParGroupe
+
+
+COULEURS_LABELS = ['#FF6B6B', "#CD4EAF", "#45D147", '#FFA07A', "#7DE3CD"]
+NOMS_SEXE = {'F': 'Femme', 'H': 'Homme'}
+
+# au-delà de ce nombre de points, le nuage imc/tension est remplacé par un histogramme 2D
+SEUIL_POINTS = 20_000
+MAX_POINTS_GROUPE = 2_000
+MAX_FLIERS = 200
+
+_executeur_rendu = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rendu')
+
+
+def _valeurs(df: pd.DataFrame, col: str) -> np.ndarray:
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def _labels_tries(labels: np.ndarray) -> np.ndarray:
+    return np.unique(labels[~np.isnan(labels)])
+
+
+def preparer_labels(df: pd.DataFrame) -> Dict:
+    labels = _valeurs(df, 'label')
+    valeurs, comptes = np.unique(labels[~np.isnan(labels)], return_counts=True)
+    return {'labels': valeurs, 'comptes': comptes}
+
+
+def preparer_ages(df: pd.DataFrame, bins: int = 15) -> Dict:
+    # un seul histogramme 2D (label x age) au lieu d'un masque + hist par label
+    labels, ages = _valeurs(df, 'label'), _valeurs(df, 'age')
+    presents = ~np.isnan(labels) & ~np.isnan(ages)
+    valeurs = _labels_tries(labels)
+    if not presents.any():
+        return {'labels': valeurs, 'bords': np.linspace(0, 1, bins + 1), 'comptes': np.zeros((len(valeurs), bins))}
+    bords_labels = np.append(valeurs - 0.5, valeurs[-1] + 0.5) if len(valeurs) > 0 else np.array([0.0, 1.0])
+    bords_ages = np.histogram_bin_edges(ages[presents], bins=bins)
+    comptes, _, _ = np.histogram2d(labels[presents], ages[presents], bins=[bords_labels, bords_ages])
+    return {'labels': valeurs, 'bords': bords_ages, 'comptes': comptes}
+
+
+def preparer_imc_tension(df: pd.DataFrame, groupe=4, seuil: int = SEUIL_POINTS, bins: int = 120) -> Dict:
+    imc, tension, labels = _valeurs(df, 'imc'), _valeurs(df, 'tensionSystolique'), _valeurs(df, 'label')
+    presents = ~np.isnan(imc) & ~np.isnan(tension)
+    masque_groupe = (labels == groupe) & presents
+    masque_autres = (labels != groupe) & presents
+    if masque_autres.sum() <= seuil:
+        resultat = {'mode': 'points', 'imc_autres': imc[masque_autres], 'tension_autres': tension[masque_autres]}
+        max_groupe = seuil
+    else:
+        comptes, bords_x, bords_y = np.histogram2d(imc[masque_autres], tension[masque_autres], bins=bins)
+        resultat = {'mode': 'densite', 'comptes': comptes, 'bords_x': bords_x, 'bords_y': bords_y}
+        # sur la densité, un échantillon du groupe suffit et reste lisible
+        max_groupe = MAX_POINTS_GROUPE
+    groupe_idx = np.flatnonzero(masque_groupe)
+    if len(groupe_idx) > max_groupe:
+        groupe_idx = np.sort(np.random.default_rng(0).choice(groupe_idx, max_groupe, replace=False))
+    resultat.update(groupe=groupe, imc_groupe=imc[groupe_idx], tension_groupe=tension[groupe_idx])
+    return resultat
+
+
+def preparer_boites(df: pd.DataFrame, col: str = 'cholesterol') -> Dict:
+    # statistiques de boîtes précalculées (même définition que boxplot : moustaches à 1.5 IQR)
+    labels, valeurs = _valeurs(df, 'label'), _valeurs(df, col)
+    stats = []
+    rng = np.random.default_rng(0)
+    for label in _labels_tries(labels):
+        x = valeurs[(labels == label) & ~np.isnan(valeurs)]
+        if len(x) == 0:
+            continue
+        q1, med, q3 = np.percentile(x, [25, 50, 75])
+        iqr = q3 - q1
+        dans = x[(x >= q1 - 1.5 * iqr) & (x <= q3 + 1.5 * iqr)]
+        fliers = x[(x < q1 - 1.5 * iqr) | (x > q3 + 1.5 * iqr)]
+        if len(fliers) > MAX_FLIERS:
+            fliers = rng.choice(fliers, MAX_FLIERS, replace=False)
+        stats.append({'label': f'L{label}', 'med': med, 'q1': q1, 'q3': q3,
+                      'whislo': dans.min(), 'whishi': dans.max(), 'fliers': fliers})
+    return {'stats': stats, 'colonne': col}
+
+
+def preparer_correlation(df: pd.DataFrame, groupe=4, correlations: Optional[CorrelationsParGroupe] = None) -> Dict:
+    # statistiques suffisantes déjà calculées (AnalyseurDonnees.correlations) ou une passe sur le groupe seul
+    if correlations is None:
+        correlations = CorrelationsParGroupe(COLONNES_CORRELATION, par=None).mettre_a_jour(
+            df[_valeurs(df, 'label') == groupe])
+        matrice = correlations.correlation()
+    else:
+        matrice = correlations.correlation(groupe)
+    return {'groupe': groupe, 'colonnes': correlations.colonnes, 'matrice': matrice}
+
+
+def preparer_risque(df: pd.DataFrame) -> Dict:
+    return {'table': pd.crosstab(df['sexe'], df['catRisque'])}
+
+
+PREPARATIONS: Dict[str, Callable[..., Dict]] = {
+    'labels': preparer_labels,
+    'ages': preparer_ages,
+    'imc_tension': preparer_imc_tension,
+    'boites': preparer_boites,
+    'correlation': preparer_correlation,
+    'risque': preparer_risque,
+}
+
+
+def preparer_panneaux(df: pd.DataFrame, noms: Optional[List[str]] = None, n_threads: int = 4,
+                      options: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Agrège les données de chaque panneau ; les agrégations numpy tournent en parallèle dans des threads.
+    options : paramètres supplémentaires par panneau, ex. {'correlation': {'correlations': ...}}.
+    """
+    noms = list(PREPARATIONS) if noms is None else noms
+    options = options or {}
+    with ThreadPoolExecutor(max_workers=max(1, n_threads)) as executeur:
+        futurs = {nom: executeur.submit(PREPARATIONS[nom], df, **options.get(nom, {})) for nom in noms}
+        return {nom: futur.result() for nom, futur in futurs.items()}
+
+
+def dessiner_labels(ax, p: Dict) -> None:
+    bars = ax.bar(p['labels'], p['comptes'], color=COULEURS_LABELS[:len(p['labels'])])
+    ax.set_xlabel('Label')
+    ax.set_ylabel('Nombre patients')
+    ax.set_title('Distribution labels')
+    ax.set_xticks(p['labels'])
+    if len(bars) > 3:
+        bars[3].set_edgecolor('red') # highlight label 4
+        bars[3].set_linewidth(3)
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{int(height)}', ha='center', va='bottom')
+
+
+def dessiner_ages(ax, p: Dict) -> None:
+    for label, comptes in zip(p['labels'], p['comptes']):
+        ax.hist(p['bords'][:-1], bins=p['bords'], weights=comptes, alpha=0.5, label=f'Label {label}')
+    ax.set_xlabel('age')
+    ax.set_ylabel('Frequence')
+    ax.set_title('Distribution age par label')
+    ax.legend()
+
+
+def dessiner_imc_tension(ax, p: Dict) -> None:
+    if p['mode'] == 'points':
+        ax.scatter(p['imc_autres'], p['tension_autres'], alpha=0.3, label='Autres labels', s=30)
+    else:
+        from matplotlib.colors import LogNorm
+        comptes = np.ma.masked_equal(p['comptes'].T, 0)
+        ax.pcolormesh(p['bords_x'], p['bords_y'], comptes, cmap='Blues', norm=LogNorm())
+    ax.scatter(p['imc_groupe'], p['tension_groupe'],
+               color='red', alpha=0.8, label=f"Label {p['groupe']}", s=50 if len(p['imc_groupe']) < 1000 else 5,
+               edgecolors='darkred')
+    ax.set_xlabel('IMC')
+    ax.set_ylabel('Tension systolique')
+    ax.set_title(f"IMC vs tension (label{p['groupe']} en rouge)")
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+def dessiner_boites(ax, p: Dict) -> None:
+    bp = ax.bxp(p['stats'], patch_artist=True)
+    for i, box in enumerate(bp['boxes']):
+        if i == 3:  # label 4
+            box.set_facecolor('red')
+            box.set_alpha(0.7)
+        else:
+            box.set_facecolor('lightblue')
+    ax.set_xlabel('Label')
+    ax.set_ylabel('cholestérol')
+    ax.set_title('distribution du cholesterol par label')
+
+
+def dessiner_correlation(ax, p: Dict) -> None:
+    corr = p['matrice']
+    if corr is None:
+        return
+    ax.imshow(corr, cmap='coolwarm', aspect='auto', vmin=-1, vmax=1)
+    ax.set_xticks(range(len(p['colonnes'])))
+    ax.set_yticks(range(len(p['colonnes'])))
+    ax.set_xticklabels(p['colonnes'], rotation=45, ha='right')
+    ax.set_yticklabels(p['colonnes'])
+    ax.set_title(f"Corrélations - patients label {p['groupe']}")
+    for (i, j), valeur in np.ndenumerate(corr):
+        ax.text(j, i, f"{valeur:.2f}", ha="center", va="center",
+                color="w" if abs(valeur) > 0.5 else "black", fontsize=8)
+
+
+def dessiner_risque(ax, p: Dict) -> None:
+    p['table'].plot(kind='bar', stacked=True, ax=ax, colormap='RdYlBu_r')
+    ax.set_xlabel('Sexe')
+    ax.set_ylabel('Nombre patients')
+    ax.set_title('Répartition de risque par sexe')
+    ax.set_xticklabels([NOMS_SEXE.get(s, s) for s in p['table'].index], rotation=0)
+    ax.legend(title='Catégorie', bbox_to_anchor=(1.05, 1), loc='upper left')
+
+
+DESSINS: Dict[str, Callable] = {
+    'labels': dessiner_labels,
+    'ages': dessiner_ages,
+    'imc_tension': dessiner_imc_tension,
+    'boites': dessiner_boites,
+    'correlation': dessiner_correlation,
+    'risque': dessiner_risque,
+}
+
+
+def dessiner_tableau(panneaux: Dict[str, Dict], figure=None):
+    """Dessine les 6 panneaux dans une Figure (créée sans pyplot si aucune n'est fournie)."""
+    if figure is None:
+        from matplotlib.figure import Figure
+        figure = Figure(figsize=(15, 10))
+    axes = figure.subplots(2, 3)
+    figure.suptitle('Analyse des données de patients', fontsize=16, fontweight='bold')
+    for ax, nom in zip(axes.flat, DESSINS):
+        if nom in panneaux:
+            DESSINS[nom](ax, panneaux[nom])
+    figure.tight_layout()
+    return figure
+
+
+def _rendre_tableau(df: pd.DataFrame, chemin: str, dpi: int, options: Optional[Dict[str, Dict]] = None,
+                    preparation: Optional[Callable[[], Any]] = None) -> str:
+    if preparation is not None:
+        preparation()
+    figure = dessiner_tableau(preparer_panneaux(df, options=options))
+    figure.savefig(chemin, dpi=dpi, bbox_inches='tight')
+    return chemin
+
+
+def rendre_en_arriere_plan(df: pd.DataFrame, chemin: str = 'analyse_patients.png', dpi: int = 300,
+                           options: Optional[Dict[str, Dict]] = None,
+                           preparation: Optional[Callable[[], Any]] = None) -> Future:
+    """
+    Lance le rendu complet dans un thread de fond et renvoie un Future (résultat : le chemin du PNG).
+    preparation (ex. import de matplotlib et style) est appelée dans ce thread, avant le dessin.
+    """
+    return _executeur_rendu.submit(_rendre_tableau, df, chemin, dpi, options, preparation)
+
+
+def _rendre_panneau(nom: str, panneau: Dict, chemin: str, dpi: int) -> str:
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(6, 5))
+    DESSINS[nom](figure.subplots(), panneau)
+    figure.tight_layout()
+    figure.savefig(chemin, dpi=dpi, bbox_inches='tight')
+    return chemin
+
+
+def rendre_panneaux(df: pd.DataFrame, dossier: str = 'panneaux', noms: Optional[List[str]] = None,
+                    dpi: int = 150, n_jobs: int = 4) -> Dict[str, Future]:
+    """
+    Rend chaque panneau dans son propre PNG, en parallèle dans un pool de processus.
+    Seuls les agrégats (petits) sont envoyés aux processus, pas les données patients.
+    """
+    os.makedirs(dossier, exist_ok=True)
+    panneaux = preparer_panneaux(df, noms)
+    executeur = ProcessPoolExecutor(max_workers=max(1, n_jobs))
+    futurs = {nom: executeur.submit(_rendre_panneau, nom, panneau, os.path.join(dossier, f'{nom}.png'), dpi)
+              for nom, panneau in panneaux.items()}
+    executeur.shutdown(wait=False)
+    return futurs
@@ -0,0 +1,255 @@
+"""
+requetes.py
+Requêtes de cohortes sur les données nettoyées avec des index construits une fois :
+- colonnes catégorielles / peu de valeurs distinctes : un bitmap (bits compressés) par valeur ;
+- colonnes numériques : ordre trié (argsort) + searchsorted pour les intervalles.
+Le prédicat le plus sélectif (estimé avec les index) est évalué en premier, les suivants
+ne vérifient que les lignes candidates. Les résultats des cohortes fréquentes sont gardés en cache (LRU).
+
+    moteur = MoteurRequetes(df)
+    ids = moteur.executer(Egal('label', 4), Intervalle('age', 60, None, inclure_bas=False),
+                          Egal('sexe', 'F'), Intervalle('tensionSystolique', 140, 160))
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+SEUIL_CARDINALITE = 64   # en dessous, une colonne numérique est indexée par bitmaps
+
+
+class IndexBitmap:
+    def __init__(self, serie: pd.Series) -> None:
+        codes, valeurs = pd.factorize(serie)
+        self.n = len(serie)
+        self.bitmaps: Dict = {}
+        self.comptes: Dict = {}
+        for code, valeur in enumerate(valeurs.tolist()):
+            masque = codes == code
+            self.bitmaps[valeur] = np.packbits(masque)
+            self.comptes[valeur] = int(masque.sum())
+
+    def estimer(self, valeurs: Iterable) -> int:
+        return sum(self.comptes.get(v, 0) for v in valeurs)
+
+    def lignes(self, valeurs: Iterable) -> np.ndarray:
+        bitmaps = [self.bitmaps[v] for v in valeurs if v in self.bitmaps]
+        if not bitmaps:
+            return np.empty(0, dtype=np.int64)
+        union = np.bitwise_or.reduce(bitmaps) if len(bitmaps) > 1 else bitmaps[0]
+        return np.flatnonzero(np.unpackbits(union, count=self.n))
+
+    def verifier(self, valeurs: Iterable, candidats: np.ndarray) -> np.ndarray:
+        # test direct des bits des candidats, sans décompresser le bitmap
+        garde = np.zeros(len(candidats), dtype=bool)
+        octets, decalages = candidats >> 3, 7 - (candidats & 7)
+        for v in valeurs:
+            if v in self.bitmaps:
+                garde |= ((self.bitmaps[v][octets] >> decalages) & 1).astype(bool)
+        return garde
+
+
+class IndexTrie:
+    def __init__(self, serie: pd.Series) -> None:
+        self.valeurs = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        self.ordre = np.argsort(self.valeurs, kind='stable')   # les NaN sont rangés à la fin
+        self.n_valides = int((~np.isnan(self.valeurs)).sum())
+        self.tries = self.valeurs[self.ordre[:self.n_valides]]
+
+    def _bornes(self, bas, haut, inclure_bas: bool, inclure_haut: bool) -> Tuple[int, int]:
+        debut = 0 if bas is None else np.searchsorted(self.tries, bas, side='left' if inclure_bas else 'right')
+        fin = self.n_valides if haut is None else np.searchsorted(self.tries, haut, side='right' if inclure_haut else 'left')
+        return int(debut), int(max(debut, fin))
+
+    def estimer(self, *bornes) -> int:
+        debut, fin = self._bornes(*bornes)
+        return fin - debut
+
+    def lignes(self, *bornes) -> np.ndarray:
+        debut, fin = self._bornes(*bornes)
+        return np.sort(self.ordre[debut:fin])
+
+    def verifier(self, bas, haut, inclure_bas: bool, inclure_haut: bool, candidats: np.ndarray) -> np.ndarray:
+        x = self.valeurs[candidats]
+        garde = ~np.isnan(x)
+        if bas is not None:
+            garde &= (x >= bas) if inclure_bas else (x > bas)
+        if haut is not None:
+            garde &= (x <= haut) if inclure_haut else (x < haut)
+        return garde
+
+
+class Egal:
+    def __init__(self, colonne: str, valeur) -> None:
+        self.colonne = colonne
+        self.valeur = valeur
+
+    def cle(self) -> Tuple:
+        return ('=', self.colonne, self.valeur)
+
+    def _appel(self, index, methode: str, *args):
+        if isinstance(index, IndexBitmap):
+            return getattr(index, methode)([self.valeur], *args)
+        return getattr(index, methode)(self.valeur, self.valeur, True, True, *args)
+
+    def estimer(self, index) -> int:
+        return self._appel(index, 'estimer')
+
+    def lignes(self, index) -> np.ndarray:
+        return self._appel(index, 'lignes')
+
+    def verifier(self, index, candidats: np.ndarray) -> np.ndarray:
+        return self._appel(index, 'verifier', candidats)
+
+    # sans index : filtre des lignes d'un fichier et élagage par min/max (voir partitions.py)
+    def masque(self, serie: pd.Series) -> np.ndarray:
+        return (serie == self.valeur).to_numpy(dtype=bool, na_value=False)
+
+    def peut_correspondre(self, minimum, maximum) -> bool:
+        try:
+            return bool(minimum <= self.valeur <= maximum)
+        except TypeError:
+            return True
+
+
+class Dans(Egal):
+    def __init__(self, colonne: str, valeurs: Iterable) -> None:
+        super().__init__(colonne, tuple(valeurs))
+
+    def cle(self) -> Tuple:
+        return ('in', self.colonne, tuple(sorted(self.valeur, key=repr)))
+
+    def _appel(self, index, methode: str, *args):
+        if isinstance(index, IndexBitmap):
+            return getattr(index, methode)(self.valeur, *args)
+        # colonne triée : union des égalités
+        resultats = [getattr(index, methode)(v, v, True, True, *args) for v in self.valeur]
+        if methode == 'estimer':
+            return sum(resultats)
+        if methode == 'lignes':
+            return np.unique(np.concatenate(resultats)) if resultats else np.empty(0, dtype=np.int64)
+        return np.logical_or.reduce(resultats) if resultats else np.zeros(len(args[0]), dtype=bool)
+
+    def masque(self, serie: pd.Series) -> np.ndarray:
+        return serie.isin(self.valeur).to_numpy(dtype=bool, na_value=False)
+
+    def peut_correspondre(self, minimum, maximum) -> bool:
+        return any(Egal(self.colonne, v).peut_correspondre(minimum, maximum) for v in self.valeur)
+
+
+class Intervalle(Egal):
+    """bas <= colonne < haut par défaut ; None = pas de borne."""
+    def __init__(self, colonne: str, bas=None, haut=None, inclure_bas: bool = True, inclure_haut: bool = False) -> None:
+        self.colonne = colonne
+        self.bornes = (bas, haut, inclure_bas, inclure_haut)
+
+    def cle(self) -> Tuple:
+        return ('range', self.colonne) + self.bornes
+
+    def _appel(self, index, methode: str, *args):
+        if isinstance(index, IndexBitmap):
+            # colonne peu variée : on teste chaque valeur distincte contre l'intervalle
+            bas, haut, inclure_bas, inclure_haut = self.bornes
+            valeurs = [v for v in index.bitmaps if isinstance(v, (int, float, np.number))
+                       and (bas is None or (v >= bas if inclure_bas else v > bas))
+                       and (haut is None or (v <= haut if inclure_haut else v < haut))]
+            return getattr(index, methode)(valeurs, *args)
+        return getattr(index, methode)(*self.bornes, *args)
+
+    def masque(self, serie: pd.Series) -> np.ndarray:
+        bas, haut, inclure_bas, inclure_haut = self.bornes
+        garde = serie.notna().to_numpy(copy=True)
+        if bas is not None:
+            garde &= (serie >= bas if inclure_bas else serie > bas).to_numpy(dtype=bool, na_value=False)
+        if haut is not None:
+            garde &= (serie <= haut if inclure_haut else serie < haut).to_numpy(dtype=bool, na_value=False)
+        return garde
+
+    def peut_correspondre(self, minimum, maximum) -> bool:
+        bas, haut, inclure_bas, inclure_haut = self.bornes
+        try:
+            if bas is not None and (maximum < bas or (maximum == bas and not inclure_bas)):
+                return False
+            if haut is not None and (minimum > haut or (minimum == haut and not inclure_haut)):
+                return False
+        except TypeError:
+            pass
+        return True
+
+
+def valeur_depuis_texte(texte: str):
+    """Valeur d'un filtre écrit en texte (ligne de commande, URL) : entier, réel ou texte."""
+    for conversion in (int, float):
+        try:
+            return conversion(texte)
+        except ValueError:
+            pass
+    return texte
+
+
+def predicat_depuis_texte(colonne: str, texte: str) -> Egal:
+    """'4' -> Egal, 'F,M' -> Dans, '60..80' / '60..' / '..80' -> Intervalle (bas inclus, haut exclu)."""
+    if '..' in texte:
+        bas, haut = texte.split('..', 1)
+        return Intervalle(colonne, valeur_depuis_texte(bas) if bas else None,
+                          valeur_depuis_texte(haut) if haut else None)
+    if ',' in texte:
+        return Dans(colonne, [valeur_depuis_texte(v) for v in texte.split(',')])
+    return Egal(colonne, valeur_depuis_texte(texte))
+
+
+class MoteurRequetes:
+    def __init__(self, df: pd.DataFrame, taille_cache: int = 256, seuil_cardinalite: int = SEUIL_CARDINALITE) -> None:
+        self.df = df
+        self.seuil_cardinalite = seuil_cardinalite
+        self.index: Dict[str, object] = {}
+        self.taille_cache = taille_cache
+        self._cache: 'OrderedDict[Tuple, np.ndarray]' = OrderedDict()
+        self.hits = 0
+        self.miss = 0
+
+    def _index(self, colonne: str):
+        # index construit à la première requête sur la colonne
+        if colonne not in self.index:
+            serie = self.df[colonne]
+            if not pd.api.types.is_numeric_dtype(serie) or serie.nunique() <= self.seuil_cardinalite:
+                self.index[colonne] = IndexBitmap(serie)
+            else:
+                self.index[colonne] = IndexTrie(serie)
+        return self.index[colonne]
+
+    def plan(self, *predicats) -> list:
+        """Prédicats triés du plus sélectif au moins sélectif (estimations exactes via les index)."""
+        return sorted(predicats, key=lambda p: p.estimer(self._index(p.colonne)))
+
+    def executer(self, *predicats) -> np.ndarray:
+        """Positions (triées) des lignes qui vérifient tous les prédicats."""
+        cle = tuple(sorted((p.cle() for p in predicats), key=repr))
+        if cle in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(cle)
+            return self._cache[cle]
+        self.miss += 1
+
+        if not predicats:
+            lignes = np.arange(len(self.df))
+        else:
+            premier, *suivants = self.plan(*predicats)
+            lignes = premier.lignes(self._index(premier.colonne))
+            for predicat in suivants:
+                if len(lignes) == 0:
+                    break
+                lignes = lignes[predicat.verifier(self._index(predicat.colonne), lignes)]
+
+        lignes.setflags(write=False)
+        self._cache[cle] = lignes
+        if len(self._cache) > self.taille_cache:
+            self._cache.popitem(last=False)
+        return lignes
+
+    def selection(self, *predicats, colonnes: Optional[list] = None) -> pd.DataFrame:
+        lignes = self.executer(*predicats)
+        return self.df.iloc[lignes] if colonnes is None else self.df.iloc[lignes][colonnes]
@@ -0,0 +1,174 @@
+"""
+serialisation.py
+Écriture des rapports JSON sans conversion récursive préalable.
+Les rapports sont construits avec des types Python natifs (moteur_rapport, agregats) ;
+les scalaires numpy qui resteraient passent par le hook `default` de json, appelé seulement pour eux.
+Les listes (liste_ids...) sont encodées par lots avec l'encodeur C de json et écrites au fil de l'eau :
+la mémoire utilisée dépend de TAILLE_LOT, pas de la taille du rapport.
+
+Modes :
+- 'indent' : même texte que json.dump(indent=2) ;
+- 'compact' : sans espaces ;
+- 'ndjson' : une ligne par section, les grandes listes découpées en lignes de TAILLE_LOT éléments.
+Compression optionnelle (gzip, bz2, xz), déduite de l'extension du fichier si elle n'est pas donnée.
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+from collections.abc import Sequence
+from typing import Any, Dict, IO, Iterator, Optional
+
+import numpy as np
+
+
+MODES = ('indent', 'compact', 'ndjson')
+COMPRESSIONS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+EXTENSIONS_COMPRESSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+TAILLE_LOT = 10_000          # éléments de liste encodés à la fois
+TAILLE_TAMPON = 1 << 20      # octets accumulés avant chaque écriture
+
+
+def _defaut(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, Sequence):
+        # vues en lecture seule (agregats.VueListe) des rapports incrémentaux
+        return list(obj)
+    raise TypeError(f"Type non sérialisable en JSON : {type(obj).__name__}")
+
+
+def _dumps(obj: Any, separateurs=(',', ':')) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=_defaut, separators=separateurs)
+
+
+def _est_liste(obj: Any) -> bool:
+    # list, tuple, ndarray et vues en lecture seule (agregats.VueListe)
+    return isinstance(obj, (Sequence, np.ndarray)) and not isinstance(obj, (str, bytes))
+
+
+def _cle(cle: Any) -> str:
+    # même règle que json : les clés non textuelles (4, 4.0, True) sont écrites sous forme de texte
+    return _dumps(cle if isinstance(cle, str) else _dumps(cle))
+
+
+def _scalaires(obj: Any) -> bool:
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        return obj.ndim == 1
+    return not any(isinstance(e, dict) or _est_liste(e) for e in obj)
+
+
+def _textes(obj: Any, indent: Optional[int], niveau: int = 0) -> Iterator[str]:
+    interieur = '' if indent is None else '\n' + ' ' * indent * (niveau + 1)
+    fin = '' if indent is None else '\n' + ' ' * indent * niveau
+    deux_points = ':' if indent is None else ': '
+
+    if isinstance(obj, dict) and obj:
+        yield '{'
+        for i, (cle, valeur) in enumerate(obj.items()):
+            yield (',' if i else '') + interieur + _cle(cle) + deux_points
+            yield from _textes(valeur, indent, niveau + 1)
+        yield fin + '}'
+    elif _est_liste(obj) and len(obj):
+        yield '['
+        if _scalaires(obj):
+            # les éléments d'un lot sont encodés en un appel, avec le séparateur du mode
+            separateur = ',' + interieur
+            for debut in range(0, len(obj), TAILLE_LOT):
+                lot = obj[debut:debut + TAILLE_LOT]
+                texte = _dumps(lot.tolist() if isinstance(lot, np.ndarray) else list(lot), (separateur, deux_points))
+                yield (separateur if debut else interieur) + texte[1:-1]
+        else:
+            # listes imbriquées (matrices de corrélation...) : chaque élément suit l'indentation
+            for i, element in enumerate(obj):
+                yield (',' if i else '') + interieur
+                yield from _textes(element, indent, niveau + 1)
+        yield fin + ']'
+    else:
+        yield _dumps(obj)
+
+
+def _lignes_ndjson(rapport: Dict) -> Iterator[str]:
+    for section, valeur in rapport.items():
+        if not isinstance(valeur, dict):
+            yield _dumps({'section': section, 'valeur': valeur}) + '\n'
+            continue
+        grandes = [cle for cle, v in valeur.items()
+                   if _est_liste(v) and len(v) > TAILLE_LOT]
+        yield _dumps({'section': section, **{c: v for c, v in valeur.items() if c not in grandes}}) + '\n'
+        for cle in grandes:
+            for debut in range(0, len(valeur[cle]), TAILLE_LOT):
+                lot = valeur[cle][debut:debut + TAILLE_LOT]
+                yield _dumps({'section': section, cle: lot}) + '\n'
+
+
+def morceaux_rapport(rapport: Dict, mode: str = 'indent') -> Iterator[bytes]:
+    """Le rapport encodé en UTF-8, par blocs d'environ TAILLE_TAMPON octets."""
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : {mode} (attendu : {', '.join(MODES)})")
+    textes = _lignes_ndjson(rapport) if mode == 'ndjson' else _textes(rapport, 2 if mode == 'indent' else None)
+    tampon, taille = [], 0
+    for texte in textes:
+        tampon.append(texte)
+        taille += len(texte)
+        if taille >= TAILLE_TAMPON:
+            yield ''.join(tampon).encode('utf-8')
+            tampon, taille = [], 0
+    if tampon:
+        yield ''.join(tampon).encode('utf-8')
+
+
+def compression_depuis_chemin(path: str) -> Optional[str]:
+    for extension, compression in EXTENSIONS_COMPRESSION.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def ouvrir(path: str, mode: str = 'rb', compression: Optional[str] = None) -> IO[bytes]:
+    compression = compression or compression_depuis_chemin(path)
+    if compression is None:
+        return open(path, mode)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compression inconnue : {compression} (attendu : {', '.join(COMPRESSIONS)})")
+    return COMPRESSIONS[compression](path, mode)
+
+
+def ecrire_rapport(rapport: Dict, path: str, mode: str = 'indent', compression: Optional[str] = None) -> int:
+    """Écrit le rapport bloc par bloc ; renvoie le nombre d'octets (non compressés) écrits."""
+    total = 0
+    with ouvrir(path, 'wb', compression) as f:
+        for morceau in morceaux_rapport(rapport, mode):
+            f.write(morceau)
+            total += len(morceau)
+    return total
+
+
+def lire_rapport(path: str, compression: Optional[str] = None) -> Dict:
+    """Relit un rapport écrit dans n'importe quel mode (les lignes NDJSON d'une section sont fusionnées)."""
+    with ouvrir(path, 'rb', compression) as f:
+        try:
+            premiere = json.loads(f.readline())
+        except ValueError:
+            # mode indent : le document s'étend sur plusieurs lignes
+            f.seek(0)
+            return json.load(f)
+        if 'section' not in premiere:
+            return premiere
+        lignes = [premiere] + [json.loads(ligne) for ligne in f if ligne.strip()]
+    rapport: Dict = {}
+    for ligne in lignes:
+        section = ligne.pop('section')
+        if 'valeur' in ligne and len(ligne) == 1:
+            rapport[section] = ligne['valeur']
+            continue
+        contenu = rapport.setdefault(section, {})
+        for cle, valeur in ligne.items():
+            if cle in contenu and isinstance(valeur, list):
+                contenu[cle].extend(valeur)
+            else:
+                contenu[cle] = valeur
+    return rapport
@@ -0,0 +1,258 @@
+"""
+service.py
+Service d'analyse asyncio : un AnalyseurDonnees chargé et nettoyé une fois reste en mémoire
+et répond en HTTP (localhost ou socket Unix) aux requêtes de cohortes et de rapports.
+- les calculs passent par un thread dédié : la boucle asyncio continue d'accepter les connexions ;
+- des requêtes identiques simultanées partagent un seul calcul ;
+- le fichier source est surveillé (mtime, taille) : un nouvel analyseur est préparé dans un second
+  thread puis remplace l'ancien d'un coup, les requêtes en cours finissent sur l'ancien.
+
+    GET /cohorte?label=4&sexe=F&age=60..&ids=1   (valeur, liste 'F,M' ou intervalle 'bas..haut')
+    GET /rapport?mode=compact&correlations=1
+    GET /etat
+    POST /recharger
+
+    curl 'http://127.0.0.1:8765/cohorte?label=4'
+    curl --unix-socket analyse.sock 'http://localhost/rapport'
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from requetes import predicat_depuis_texte
+from serialisation import morceaux_rapport
+
+
+COLONNES_MOYENNES = ['age', 'imc', 'tensionSystolique']
+STATUTS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+TYPES = {'ndjson': 'application/x-ndjson'}
+
+
+def _json(obj: Any) -> bytes:
+    return b''.join(morceaux_rapport(obj, 'compact'))
+
+
+def _vrai(texte: Optional[str]) -> bool:
+    return texte is not None and texte.lower() in ('1', 'true', 'oui')
+
+
+async def _ecrire(writer: asyncio.StreamWriter, statut: int, corps: bytes, type_contenu: str, garder: bool) -> None:
+    writer.write(
+        f"HTTP/1.1 {statut} {STATUTS[statut]}\r\nContent-Type: {type_contenu}; charset=utf-8\r\n"
+        f"Content-Length: {len(corps)}\r\nConnection: {'keep-alive' if garder else 'close'}\r\n\r\n"
+        .encode('latin-1') + corps)
+    await writer.drain()
+
+
+def cohorte(analyseur, parametres: Dict[str, str]) -> Tuple[bytes, str]:
+    """Taille, part et moyennes de la cohorte ; les paramètres autres que 'ids' sont des filtres."""
+    predicats = [predicat_depuis_texte(col, texte) for col, texte in parametres.items() if col != 'ids']
+    df = analyseur.donnees_nettoyees
+    lignes = analyseur.moteur_requetes.executer(*predicats)
+    resultat = {
+        'nombre': int(len(lignes)),
+        'pourcentage': float(len(lignes) / len(df) * 100) if len(df) else 0.0,
+        'moyennes': {col: (float(df[col].iloc[lignes].mean()) if len(lignes) else None)
+                     for col in COLONNES_MOYENNES if col in df.columns}
+    }
+    if _vrai(parametres.get('ids')):
+        resultat['liste_ids'] = df['patientId'].to_numpy()[lignes]
+    return _json(resultat), 'application/json'
+
+
+def rapport(analyseur, parametres: Dict[str, str]) -> Tuple[bytes, str]:
+    # JSON déjà sérialisé dans le cache des rapports tant que les données ne changent pas
+    mode = parametres.get('mode', 'compact')
+    octets = analyseur.rapport_json(mode=mode, correlations=_vrai(parametres.get('correlations')))
+    return octets, TYPES.get(mode, 'application/json')
+
+
+ROUTES: Dict[str, Callable] = {'/cohorte': cohorte, '/rapport': rapport}
+
+
+class ServiceAnalyse:
+    """
+    charger(path) renvoie un AnalyseurDonnees prêt (chargé et nettoyé) ;
+    intervalle : secondes entre deux vérifications du fichier source (None : pas de rechargement).
+    """
+    def __init__(self, charger: Callable[[str], Any], path: str, intervalle: Optional[float] = 1.0,
+                 verbeux: bool = False) -> None:
+        self.charger = charger
+        self.path = path
+        self.intervalle = intervalle
+        self.verbeux = verbeux
+        self.analyseur = None
+        self.generation = 0
+        self.requetes = 0
+        self.regroupees = 0
+        self._signature = None
+        # un seul thread de calcul : l'analyseur (index, caches) n'est pas partagé entre threads
+        self._calcul = ThreadPoolExecutor(1, thread_name_prefix='calcul')
+        self._rechargement = ThreadPoolExecutor(1, thread_name_prefix='rechargement')
+        self._en_cours: Dict[Tuple, asyncio.Future] = {}
+        self._verrou = None
+        self._surveillance = None
+        self._serveur = None
+        self._chemin_socket = None
+
+    def _afficher(self, *args, **kwargs) -> None:
+        if self.verbeux:
+            print(*args, **kwargs)
+
+    def _signature_fichier(self) -> Optional[Tuple[int, int]]:
+        try:
+            infos = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (infos.st_mtime_ns, infos.st_size)
+
+    async def recharger(self) -> None:
+        if self._verrou is None:
+            self._verrou = asyncio.Lock()
+        async with self._verrou:
+            # signature lue avant le chargement : une écriture pendant le chargement relancera un rechargement
+            signature = self._signature_fichier()
+            analyseur = await asyncio.get_running_loop().run_in_executor(self._rechargement, self.charger, self.path)
+            self.analyseur, self._signature = analyseur, signature
+            self.generation += 1
+            self._afficher(f"{self.path} chargé (génération {self.generation})")
+
+    async def _surveiller(self) -> None:
+        while True:
+            await asyncio.sleep(self.intervalle)
+            signature = self._signature_fichier()
+            if signature is None or signature == self._signature:
+                continue
+            try:
+                await self.recharger()
+            except Exception as erreur:
+                # fichier en cours d'écriture ou invalide : on garde les données actuelles
+                self._signature = signature
+                self._afficher(f"Rechargement de {self.path} impossible : {erreur}")
+
+    async def appeler(self, route: str, parametres: Dict[str, str]) -> Tuple[bytes, str]:
+        """Exécute une route dans le thread de calcul ; les appels identiques simultanés sont regroupés."""
+        if self.analyseur is None:
+            raise RuntimeError("Données pas encore chargées")
+        self.requetes += 1
+        cle = (self.generation, route, tuple(sorted(parametres.items())))
+        future = self._en_cours.get(cle)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self._calcul, ROUTES[route], self.analyseur, parametres)
+            self._en_cours[cle] = future
+            future.add_done_callback(lambda _: self._en_cours.pop(cle, None))
+        else:
+            self.regroupees += 1
+        # shield : un client qui se déconnecte n'annule pas le calcul partagé
+        return await asyncio.shield(future)
+
+    def etat(self) -> Dict:
+        df = None if self.analyseur is None else self.analyseur.donnees_nettoyees
+        return {'source': self.path, 'generation': self.generation,
+                'patients': None if df is None else len(df),
+                'requetes': self.requetes, 'regroupees': self.regroupees}
+
+    async def _repondre(self, methode: str, cible: str) -> Tuple[int, bytes, str]:
+        url = urlsplit(cible)
+        parametres = dict(parse_qsl(url.query))
+        try:
+            if url.path == '/etat':
+                return 200, _json(self.etat()), 'application/json'
+            if url.path == '/recharger':
+                if methode != 'POST':
+                    return 405, _json({'erreur': 'POST attendu'}), 'application/json'
+                try:
+                    await self.recharger()
+                except Exception as erreur:
+                    return 500, _json({'erreur': f"Rechargement impossible : {erreur}"}), 'application/json'
+                return 200, _json(self.etat()), 'application/json'
+            if url.path not in ROUTES:
+                return 404, _json({'erreur': f"Route inconnue : {url.path}"}), 'application/json'
+            corps, type_contenu = await self.appeler(url.path, parametres)
+            return 200, corps, type_contenu
+        except RuntimeError as erreur:
+            return 503, _json({'erreur': str(erreur)}), 'application/json'
+        except (KeyError, ValueError, TypeError) as erreur:
+            # colonne inconnue, mode de rapport invalide, comparaison impossible...
+            return 400, _json({'erreur': f"{type(erreur).__name__} : {erreur}"}), 'application/json'
+        except Exception as erreur:
+            # toute autre erreur de calcul : réponse 500, la connexion reste utilisable
+            return 500, _json({'erreur': f"{type(erreur).__name__} : {erreur}"}), 'application/json'
+
+    async def _connexion(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # HTTP/1.1 minimal : requêtes successives sur la même connexion (keep-alive)
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne.strip():
+                    break
+                entetes = {}
+                while True:
+                    entete = await reader.readline()
+                    if not entete.strip():
+                        break
+                    nom, _, valeur = entete.decode('latin-1').partition(':')
+                    entetes[nom.strip().lower()] = valeur.strip()
+                if int(entetes.get('content-length', 0)):
+                    await reader.readexactly(int(entetes['content-length']))
+
+                morceaux = ligne.decode('latin-1').split()
+                if len(morceaux) != 3:
+                    statut, corps, type_contenu = 400, _json({'erreur': 'requête invalide'}), 'application/json'
+                    garder = False
+                else:
+                    methode, cible, version = morceaux
+                    statut, corps, type_contenu = await self._repondre(methode, cible)
+                    garder = version == 'HTTP/1.1' and entetes.get('connection', '').lower() != 'close'
+                await _ecrire(writer, statut, corps, type_contenu, garder)
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as erreur:
+            # requête mal formée ou erreur inattendue : le client reçoit quand même une réponse
+            statut = 400 if isinstance(erreur, ValueError) else 500
+            try:
+                await _ecrire(writer, statut, _json({'erreur': f"{type(erreur).__name__} : {erreur}"}),
+                              'application/json', False)
+            except Exception:
+                pass
+        finally:
+            writer.close()
+
+    async def demarrer(self, hote: str = '127.0.0.1', port: int = 8765,
+                       chemin_socket: Optional[str] = None) -> asyncio.AbstractServer:
+        """Charge les données puis ouvre le serveur (socket Unix si chemin_socket est donné)."""
+        await self.recharger()
+        if chemin_socket is not None:
+            self._chemin_socket = chemin_socket
+            self._serveur = await asyncio.start_unix_server(self._connexion, chemin_socket)
+        else:
+            self._serveur = await asyncio.start_server(self._connexion, hote, port)
+        if self.intervalle is not None:
+            self._surveillance = asyncio.create_task(self._surveiller())
+        return self._serveur
+
+    async def servir(self, hote: str = '127.0.0.1', port: int = 8765, chemin_socket: Optional[str] = None) -> None:
+        serveur = await self.demarrer(hote, port, chemin_socket)
+        adresse = chemin_socket or f"http://{hote}:{serveur.sockets[0].getsockname()[1]}"
+        self._afficher(f"Service d'analyse sur {adresse}")
+        try:
+            await serveur.serve_forever()
+        finally:
+            await self.arreter()
+
+    async def arreter(self) -> None:
+        if self._surveillance is not None:
+            self._surveillance.cancel()
+        if self._serveur is not None:
+            self._serveur.close()
+            await self._serveur.wait_closed()
+        if self._chemin_socket is not None and os.path.exists(self._chemin_socket):
+            os.remove(self._chemin_socket)
+        self._calcul.shutdown(wait=False)
+        self._rechargement.shutdown(wait=False)
@@ -0,0 +1,93 @@
+"""
+stockage_partage.py
+Stockage des patients en tableaux numpy mappés en mémoire (un fichier .npy par colonne).
+Plusieurs processus peuvent ouvrir le même dossier en lecture seule : les pages sont
+partagées par le système, aucun processus ne fait sa propre copie des colonnes numériques.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+COLONNES_NUMERIQUES = ['age', 'poids', 'taille', 'tensionSystolique', 'tensionDiastolique',
+                       'cholesterol', 'glucose', 'label', 'imc']
+
+
+class StockagePatients:
+    """Dossier de colonnes .npy ouvertes en lecture seule avec np.load(mmap_mode='r')."""
+    def __init__(self, dossier: str) -> None:
+        self.dossier = dossier
+        with open(os.path.join(dossier, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._colonnes: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def creer(cls, df: pd.DataFrame, dossier: str) -> 'StockagePatients':
+        os.makedirs(dossier, exist_ok=True)
+        meta = {'n': len(df), 'numeriques': [], 'categories': {}, 'ordonnees': [], 'identifiants': None}
+        for col in COLONNES_NUMERIQUES:
+            if col in df.columns:
+                valeurs = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float32', na_value=np.nan)
+                np.save(os.path.join(dossier, f'{col}.npy'), valeurs)
+                meta['numeriques'].append(col)
+        for col in ('sexe', 'catRisque'):
+            if col in df.columns:
+                cat = df[col].astype('category').cat
+                np.save(os.path.join(dossier, f'{col}.npy'), cat.codes.to_numpy(dtype='int8'))
+                meta['categories'][col] = [str(c) for c in cat.categories]
+                if cat.ordered:
+                    # ordre des catégories gardé (catRisque : Normal < Préhypertension < ...)
+                    meta['ordonnees'].append(col)
+        if 'patientId' in df.columns:
+            # largeur fixe pour pouvoir mapper les identifiants comme le reste
+            np.save(os.path.join(dossier, 'patientId.npy'), df['patientId'].fillna('').to_numpy(dtype=str).astype('S'))
+            meta['identifiants'] = 'patientId'
+        with open(os.path.join(dossier, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        return cls(dossier)
+
+    def __len__(self) -> int:
+        return self.meta['n']
+
+    @property
+    def colonnes(self) -> List[str]:
+        return self.meta['numeriques'] + list(self.meta['categories'])
+
+    def colonne(self, nom: str) -> np.ndarray:
+        """Tableau mappé en lecture seule (codes entiers pour les colonnes catégorielles)."""
+        if nom not in self._colonnes:
+            self._colonnes[nom] = np.load(os.path.join(self.dossier, f'{nom}.npy'), mmap_mode='r')
+        return self._colonnes[nom]
+
+    def indices(self, col: str, val) -> np.ndarray:
+        """Indices des lignes où col == val (pas de copie des autres colonnes)."""
+        if col in self.meta['categories']:
+            categories = self.meta['categories'][col]
+            if str(val) not in categories:
+                return np.empty(0, dtype=np.intp)
+            return np.flatnonzero(self.colonne(col) == categories.index(str(val)))
+        return np.flatnonzero(self.colonne(col) == val)
+
+    def identifiants(self, indices: Optional[np.ndarray] = None) -> List[str]:
+        ids = self.colonne(self.meta['identifiants'])
+        ids = ids if indices is None else ids[indices]
+        return np.char.decode(ids, 'utf-8').tolist()
+
+    def vers_dataframe(self, colonnes: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        DataFrame dont les colonnes numériques pointent directement sur les fichiers mappés
+        (copy=False : un bloc par colonne, pas de consolidation). Les identifiants ne sont pas
+        chargés, on les récupère à la demande avec identifiants(indices).
+        """
+        data = {}
+        for col in (colonnes or self.colonnes):
+            if col in self.meta['categories']:
+                data[col] = pd.Categorical.from_codes(self.colonne(col), self.meta['categories'][col],
+                                                      ordered=col in self.meta.get('ordonnees', ()))
+            else:
+                data[col] = self.colonne(col)
+        return pd.DataFrame(data, copy=False)
@@ -0,0 +1,223 @@
+"""
+test_analyse.py
+Chaque chemin rapide (flux, incrémental, parallèle, cache, stockage mappé, partitions,
+sérialisation par blocs) est comparé au calcul direct sur le DataFrame complet.
+
+    python -m pytest -q
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from exo4_b import AnalyseurDonnees
+from generation import generer_patients
+from imputation import StrategieImputation
+from moteur_rapport import MoteurRapport
+from partitions import JeuPartitionne
+from requetes import Dans, Egal, Intervalle
+from serialisation import lire_rapport, morceaux_rapport
+
+
+N_PATIENTS = 3000
+
+
+def proches(a, b) -> None:
+    """Égalité récursive des rapports, à l'arrondi près pour les flottants (NaN == NaN)."""
+    if isinstance(a, dict):
+        assert isinstance(b, dict) and list(a) == list(b)
+        for cle in a:
+            proches(a[cle], b[cle])
+    elif isinstance(a, (list, tuple)):
+        assert isinstance(b, (list, tuple)) and len(a) == len(b)
+        for x, y in zip(a, b):
+            proches(x, y)
+    elif isinstance(a, float) or isinstance(b, float):
+        assert (math.isnan(a) and math.isnan(b)) or a == pytest.approx(b, rel=1e-9, abs=1e-9)
+    else:
+        assert a == b
+
+
+@pytest.fixture(scope='module')
+def csv(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp('donnees') / 'patients.csv')
+    analyseur = AnalyseurDonnees()
+    analyseur.generer_donnees_exemple(N_PATIENTS)
+    analyseur.sauvegarder_donness(path)
+    return path
+
+
+@pytest.fixture
+def analyseur(csv) -> AnalyseurDonnees:
+    analyseur = AnalyseurDonnees()
+    analyseur.charger_donnees(csv)
+    return analyseur
+
+
+def test_generation_vide_garde_le_schema():
+    donnees = AnalyseurDonnees().generer_donnees_exemple(0)
+    assert len(donnees) == 0
+    assert {'patientId', 'sexe', 'label', 'imc', 'catRisque'} <= set(donnees.columns)
+
+
+def test_colonnes_derivees_recalculees_au_chargement(csv, tmp_path):
+    faux = pd.read_csv(csv).assign(imc=999.0)
+    faux.to_csv(tmp_path / 'faux.csv', index=False)
+    analyseur = AnalyseurDonnees()
+    attendu = (faux['poids'] / (faux['taille'] / 100) ** 2).round(2)
+    for colonnes in (None, ['patientId', 'imc']):
+        donnees = analyseur.charger_donnees(str(tmp_path / 'faux.csv'), colonnes=colonnes)
+        pd.testing.assert_series_equal(donnees['imc'], attendu, check_names=False)
+
+
+def test_rapport_identique_au_moteur(analyseur):
+    proches(analyseur.generer_rapport(), MoteurRapport().calculer(analyseur.donnees))
+
+
+def test_rapport_flux_identique_au_rapport(analyseur, csv):
+    proches(analyseur.generer_rapport_flux(csv, taille_chunk=700), analyseur.generer_rapport())
+
+
+@pytest.mark.parametrize('source', ['csv', 'generation'])
+def test_rapport_parallele_identique_au_serie(analyseur, source):
+    if source == 'generation':
+        # colonnes nullables (Int8, Int16) : value_counts renvoie des scalaires numpy
+        analyseur = AnalyseurDonnees()
+        analyseur.generer_donnees_exemple(N_PATIENTS)
+    serie = analyseur.generer_rapport()
+    analyseur.cache_rapports.vider()
+    parallele = analyseur.generer_rapport(n_jobs=2)
+    # moyennes fusionnées par tranches : égales à l'arrondi près ; types natifs comme en série
+    proches(parallele, serie)
+    json.dumps(parallele)
+
+
+def test_rapport_renvoye_est_une_copie(analyseur):
+    rapport = analyseur.generer_rapport()
+    json_avant = analyseur.rapport_json()
+    rapport['patients_label_4']['liste_ids'].clear()
+    rapport['resume_general']['nombre_total_patients'] = -1
+    assert analyseur.generer_rapport()['resume_general']['nombre_total_patients'] == N_PATIENTS
+    assert analyseur.rapport_json() == json_avant
+
+
+def test_ajout_incremental_identique_au_calcul_complet(analyseur):
+    analyseur.nettoyer_donnees()
+    for lot in generer_patients(1500, graine=3, taille_chunk=500):
+        analyseur.ajouter_patients(lot)
+        rapport = analyseur.generer_rapport(correlations=True)
+    complet = AnalyseurDonnees()
+    complet.donnees = analyseur.donnees.copy()
+    proches(rapport, complet.generer_rapport(correlations=True))
+    assert type(rapport['patients_label_4']['liste_ids']) is list
+    json.dumps(rapport)
+    assert len(analyseur.donnees_nettoyees) == N_PATIENTS + 1500
+    assert analyseur.donnees_nettoyees.drop(columns=['catRisque']).notna().all().all()
+
+
+def test_invalider_colonnes_apres_ajout(analyseur):
+    analyseur.ajouter_patients(next(generer_patients(100, graine=5)))
+    analyseur.generer_rapport()
+    analyseur.donnees['tensionSystolique'] += 100
+    analyseur.invalider_colonnes(['tensionSystolique'])
+    proches(analyseur.generer_rapport(), MoteurRapport().calculer(analyseur.donnees))
+
+
+@pytest.mark.parametrize('strategie', [StrategieImputation(), StrategieImputation(par='label')])
+def test_nettoyage_flux_exact_identique(analyseur, csv, tmp_path, strategie):
+    sortie = str(tmp_path / 'nettoyees.csv')
+    analyseur.nettoyer_flux(csv, sortie, taille_chunk=700, strategie=strategie)
+    analyseur.nettoyer_donnees(strategie=strategie)
+    attendu = analyseur.donnees_nettoyees
+    obtenu = pd.read_csv(sortie)
+    for col in ['age', 'poids', 'taille', 'tensionSystolique', 'cholesterol', 'glucose', 'label', 'imc']:
+        np.testing.assert_allclose(obtenu[col].to_numpy(float), attendu[col].to_numpy(float), err_msg=col)
+    assert (obtenu['sexe'] == attendu['sexe'].astype(str)).all()
+
+
+def test_requete_identique_aux_masques(analyseur):
+    analyseur.nettoyer_donnees()
+    df = analyseur.donnees_nettoyees
+    predicats = [Egal('label', 4), Intervalle('age', 60, inclure_bas=False), Dans('sexe', ['F']),
+                 Intervalle('tensionSystolique', 120, 160)]
+    attendu = df[(df['label'] == 4) & (df['age'] > 60) & (df['sexe'] == 'F')
+                 & df['tensionSystolique'].between(120, 160)]
+    assert analyseur.requete(*predicats)['patientId'].tolist() == attendu['patientId'].tolist()
+    assert len(analyseur.analyser_patients('label', 4)) == int((df['label'] == 4).sum())
+
+
+def test_correlations_identiques_a_pandas(analyseur, csv):
+    correlations = analyseur.correlations()
+    completes = analyseur.donnees[correlations.colonnes + ['label']].astype(float).dropna(subset=correlations.colonnes)
+    np.testing.assert_allclose(correlations.correlation(), completes[correlations.colonnes].corr(), atol=1e-9)
+    np.testing.assert_allclose(correlations.correlation(4),
+                               completes[completes['label'] == 4][correlations.colonnes].corr(), atol=1e-9)
+    flux = analyseur.correlations_flux(csv, taille_chunk=700)
+    np.testing.assert_allclose(flux.correlation(), correlations.correlation(), atol=1e-9)
+
+
+def test_stockage_mappe_identique_en_memoire(analyseur, tmp_path):
+    analyseur.nettoyer_donnees()
+    analyseur.creer_stockage(str(tmp_path / 'stockage'))
+    memoire = analyseur.donnees_nettoyees
+    mappe = AnalyseurDonnees()
+    donnees = mappe.ouvrir_stockage(str(tmp_path / 'stockage'))
+    for col in ['age', 'tensionSystolique', 'label']:
+        np.testing.assert_array_equal(donnees[col].to_numpy(float), memoire[col].to_numpy(float))
+    assert donnees['catRisque'].cat.ordered
+    assert (donnees['catRisque'] > 'Préhypertension').sum() == (memoire['catRisque'] > 'Préhypertension').sum()
+    assert len(mappe.analyser_patients('label', 4)) == int((memoire['label'] == 4).sum())
+    top_mappe, top_memoire = mappe.analyser_groupes('label').top_imc[4], analyseur.analyser_groupes('label').top_imc[4]
+    assert top_mappe['patientId'].tolist() == top_memoire['patientId'].tolist()
+
+
+def test_stockage_oublie_apres_modification(analyseur, tmp_path):
+    analyseur.nettoyer_donnees()
+    analyseur.creer_stockage(str(tmp_path / 'stockage'))
+    analyseur.ajouter_patients(next(generer_patients(500, graine=9)))
+    attendu = int((analyseur.donnees_nettoyees['label'] == 4).sum())
+    assert len(analyseur.analyser_patients('label', 4)) == attendu
+    analyseur.generer_donnees_exemple(200)
+    analyseur.nettoyer_donnees()
+    assert len(analyseur.analyser_patients('label', 4)) == int((analyseur.donnees_nettoyees['label'] == 4).sum())
+
+
+@pytest.mark.parametrize('filtres', [
+    [Egal('label', 4)],
+    [Egal('label', 4), Intervalle('age', 60)],
+    [Dans('label', [1, 5]), Egal('sexe', 'F')],
+    [Intervalle('imc', 30)],
+    [Egal('label', 9)],
+])
+def test_partitions_identiques_aux_masques(analyseur, tmp_path, filtres):
+    dossier = str(tmp_path / 'partitions')
+    JeuPartitionne.ecrire(analyseur.donnees, dossier, par=['label'])
+    df = analyseur.donnees
+    masque = np.logical_and.reduce([p.masque(df[p.colonne]) for p in filtres])
+    lu = AnalyseurDonnees().charger_donnees(dossier, filtres=filtres)
+    assert sorted(lu['patientId']) == sorted(df.loc[masque, 'patientId'])
+    rapport = AnalyseurDonnees().generer_rapport_partitions(dossier, filtres)
+    attendu = MoteurRapport().calculer(df[masque].reset_index(drop=True))
+    assert rapport['resume_general']['nombre_total_patients'] == attendu['resume_general']['nombre_total_patients']
+    assert sorted(rapport['patients_label_4']['liste_ids']) == sorted(attendu['patients_label_4']['liste_ids'])
+
+
+def test_serialisation_identique_a_json(analyseur):
+    rapport = analyseur.generer_rapport(correlations=True)
+    texte = json.loads(json.dumps(rapport, allow_nan=True))
+    attendus = {'indent': json.dumps(texte, indent=2, ensure_ascii=False),
+                'compact': json.dumps(texte, separators=(',', ':'), ensure_ascii=False)}
+    for mode, attendu in attendus.items():
+        assert b''.join(morceaux_rapport(rapport, mode)).decode('utf-8') == attendu
+        assert analyseur.rapport_json(mode=mode, correlations=True).decode('utf-8') == attendu
+
+
+@pytest.mark.parametrize('mode', ['indent', 'compact', 'ndjson'])
+@pytest.mark.parametrize('extension', ['.json', '.json.gz', '.json.xz'])
+def test_export_relu_identique(analyseur, tmp_path, mode, extension):
+    path = str(tmp_path / f'rapport{extension}')
+    exporte = analyseur.export_rapport(path, mode=mode, correlations=True)
+    proches(lire_rapport(path), json.loads(json.dumps(exporte)))